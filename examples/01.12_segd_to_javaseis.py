@@ -83,34 +83,19 @@ os.makedirs(path_to_javaseis, exist_ok=True)
 # Save the XML files
 dataset.save(path_to_javaseis)
 
-# Create trace and header data files
-header_file = open(os.path.join(path_to_javaseis, "TraceHeaders0"), "wb")
-trace_file = open(os.path.join(path_to_javaseis, "TraceFile0"), "wb")
-
-# Write trace headers and data
-for i, trace in enumerate(traces):
-    # Create header dictionary using general headers
-    header = {
-        "SEQNO": i + 1,  # Use the existing SEQNO header
-        "FFID": segd.data.data.general_headers_n[0].expanded_file_number,
-        "S_LINE": segd.data.data.general_headers_n[0].source_line_number_int,
-        "SOU_SLOC": segd.data.data.general_headers_n[0].source_point_number_int,
-        "R_LINE": trace.trace_header_extensions.ext1.receiver_line_number,
-        "SRF_SLOC": trace.trace_header_extensions.ext1.receiver_point_number,
-        "FRAME": 1
-    }
-    
-    # Write trace and headers using write_trace
-    dataset.write_trace(
-        trace_data=np.array(trace.trace_data, dtype=np.float32),
-        headers=header,
-        trace_file=trace_file,
-        header_file=header_file
-    )
-
-# Close files
-header_file.close()
-trace_file.close()
+# Build the whole frame at once and write it in one go
+general_header = segd.data.data.general_headers_n[0]
+headers = np.zeros(ntraces, dtype=dataset.header_dtype)
+headers["SEQNO"] = np.arange(1, ntraces + 1)  # Use the existing SEQNO header
+headers["FFID"] = general_header.expanded_file_number
+headers["S_LINE"] = general_header.source_line_number_int
+headers["SOU_SLOC"] = general_header.source_point_number_int
+headers["R_LINE"] = [trace.trace_header_extensions.ext1.receiver_line_number for trace in traces]
+headers["SRF_SLOC"] = [trace.trace_header_extensions.ext1.receiver_point_number for trace in traces]
+headers["FRAME"] = 1
+
+trace_data = np.array([trace.trace_data for trace in traces], dtype=np.float32)
+dataset.write_frame(0, trace_data, headers)
 
 print(f"JavaSeis dataset created at: {path_to_javaseis}")
 
@@ -21,9 +21,7 @@ nsamples, ntraces, nframes = axis_lengths
 # Load all headers into DataFrame
 all_headers = []
 all_traces = []
-for frame in range(nframes):
-    headers = dataset.get_headers(frame * ntraces, ntraces)
-    traces = dataset.get_traces(frame * ntraces, ntraces)
+for volume, frame, traces, headers in dataset.iter_frames():
     all_headers.extend(headers)
     all_traces.extend(traces)
 
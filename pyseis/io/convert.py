@@ -0,0 +1,88 @@
+"""
+Parallel conversion between seismic file formats.
+
+Conversions split the input trace section into ranges of whole trace
+records. Worker processes each decode one range and write it straight into
+its preallocated region of the output, so trace data never passes through
+the parent process.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+import numpy as np
+
+from pyseis.io.maps import SEGY_TO_JAVASEIS
+from pyseis.io.segy.segy import SegyReader
+from pyseis.io.javaseis.javaseis import JavaSeis
+
+# Traces converted per worker task
+CHUNK_TRACES = 16384
+
+def _map_headers(segy_headers: np.ndarray, header_dtype: np.dtype, header_map: Dict[str, str],
+                 start: int) -> np.ndarray:
+    """Build JavaSeis headers from SEG-Y trace headers"""
+    headers = np.zeros(len(segy_headers), dtype=header_dtype)
+    headers["SEQNO"] = np.arange(start + 1, start + len(segy_headers) + 1)
+    for segy_field, label in header_map.items():
+        headers[label] = segy_headers[segy_field]
+    return headers
+
+def _convert_segy_range(segy_path: str, js_path: str, start: int, count: int,
+                        header_map: Dict[str, str]) -> int:
+    """Worker: decode a range of SEG-Y traces and write it into the JavaSeis extents"""
+    with SegyReader(segy_path) as segy, JavaSeis() as dataset:
+        dataset.load(js_path, mode='a')
+        traces = segy.get_traces(start, count)
+        headers = _map_headers(segy.get_headers(start, count), dataset.header_dtype, header_map, start)
+        dataset.write_traces(start, traces, headers)
+    return count
+
+def segy_to_javaseis(segy_path: str, js_path: str, traces_per_frame: int,
+                     header_map: Dict[str, str] = None, max_workers: int = None,
+                     chunk_traces: int = CHUNK_TRACES, trace_format: str = "COMPRESSED_INT16") -> JavaSeis:
+    """Convert a fixed-length SEG-Y file to a JavaSeis dataset in parallel.
+
+    The dataset is created and its extents preallocated by the parent
+    process, then ranges of chunk_traces traces are decoded (including IBM
+    samples) and written in place by a pool of worker processes.
+
+    Args:
+        segy_path: Input SEG-Y file
+        js_path: Output JavaSeis dataset directory
+        traces_per_frame: Traces in each JavaSeis frame. The last frame's
+            fold is set to the traces left over.
+        header_map: SEG-Y trace header fields to JavaSeis header labels
+            (default SEGY_TO_JAVASEIS). SEQNO is always the trace number.
+        max_workers: Number of worker processes (default one per CPU)
+        chunk_traces: Traces converted per worker task
+        trace_format: JavaSeis TraceFormat of the output
+    Returns:
+        JavaSeis: The written dataset
+    """
+    header_map = SEGY_TO_JAVASEIS if header_map is None else header_map
+    with SegyReader(segy_path) as segy:
+        if segy.variable_length:
+            raise ValueError("Variable-length SEG-Y files cannot be converted to JavaSeis frames")
+        ntraces, nsamples = segy.ntraces, segy.nsamples
+        segy_header_dtype = segy.header_dtype
+
+    nframes = max(1, -(-ntraces // traces_per_frame))
+    dataset = JavaSeis()
+    dataset.create_new(nsamples, traces_per_frame, nframes, trace_format=trace_format)
+    for segy_field, label in header_map.items():
+        if label not in dataset.header_dtype.names:
+            kind = segy_header_dtype.fields[segy_field][0].kind
+            dataset.add_header(label=label, description=segy_field, format="FLOAT" if kind == 'f' else "INTEGER")
+    dataset.save(js_path)
+    if ntraces % traces_per_frame:
+        dataset.set_fold(nframes - 1, ntraces % traces_per_frame)
+
+    ranges = [(start, min(chunk_traces, ntraces - start)) for start in range(0, ntraces, chunk_traces)]
+    with ProcessPoolExecutor(max_workers or os.cpu_count()) as executor:
+        futures = [executor.submit(_convert_segy_range, segy_path, js_path, start, count, header_map)
+                   for start, count in ranges]
+        for future in futures:
+            future.result()
+    return dataset
@@ -15,6 +15,9 @@ import xml.etree.ElementTree as ET
 from datetime import datetime
 import pytz
 from math import floor
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -27,55 +30,430 @@ sys.path.insert(0, project_root)
 from pyseis.io.javaseis.xml_io import JavaSeisXML
 from pyseis.io.javaseis.templates import *  # Import all templates
 from pyseis.io.javaseis.templates import FilePropertiesTemplate, VirtualFoldersTemplate, TraceHeadersTemplate, TraceFileTemplate
-from pyseis.io.javaseis.js_models import build_header_struct, build_trace_struct
+from pyseis.io.javaseis.js_models import build_header_struct, build_trace_struct, build_header_dtype, build_trace_codec
+
+# Largest single positioned read issued by the concurrent reader
+READ_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Default bound on open extent files per ExtentManager handle pool
+MAX_OPEN_FILES = 64
+
+# Default extent size for datasets created empty and grown with append_frame
+APPEND_EXTENT_BYTES = 256 * 1024 * 1024
+
+def _pread_into(fd, buffer, offset):
+    """Positioned read that fills the whole buffer"""
+    view = memoryview(buffer).cast('B')
+    while view:
+        nread = os.preadv(fd, [view], offset)
+        if nread == 0:
+            raise ValueError("Extent is shorter than expected")
+        view = view[nread:]
+        offset += nread
+
+def _pwrite_all(fd, buffer, offset):
+    """Positioned write that retries until the whole buffer is written"""
+    view = memoryview(buffer).cast('B')
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+class _HandlePool:
+    """Bounded pool of extent file descriptors with LRU eviction.
+
+    Descriptors are reference counted while in use, so a descriptor evicted
+    by one thread is only closed once every other thread has released it.
+    """
+    def __init__(self, paths, flags, max_open=MAX_OPEN_FILES):
+        self.paths = paths
+        self.flags = flags
+        self.max_open = max_open
+        self._fds = OrderedDict()  # extent_index -> fd, least recently used first
+        self._users = {}  # fd -> number of threads using it
+        self._retired = set()  # evicted fds still in use
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, extent_index):
+        """Borrow the descriptor for an extent"""
+        with self._lock:
+            fd = self._fds.get(extent_index)
+            if fd is None:
+                if extent_index >= len(self.paths):
+                    raise ValueError(f"Extent index {extent_index} out of range")
+                fd = os.open(self.paths[extent_index], self.flags)
+                self._fds[extent_index] = fd
+                self._evict()
+            else:
+                self._fds.move_to_end(extent_index)
+            self._users[fd] = self._users.get(fd, 0) + 1
+        try:
+            yield fd
+        finally:
+            with self._lock:
+                self._users[fd] -= 1
+                if not self._users[fd]:
+                    del self._users[fd]
+                    if fd in self._retired:
+                        self._retired.discard(fd)
+                        os.close(fd)
+
+    def _evict(self):
+        while len(self._fds) > self.max_open:
+            _, fd = self._fds.popitem(last=False)
+            self._retire(fd)
+
+    def _retire(self, fd):
+        if fd in self._users:
+            self._retired.add(fd)
+        else:
+            os.close(fd)
+
+    def close(self):
+        """Close every descriptor once it is no longer in use"""
+        with self._lock:
+            for fd in self._fds.values():
+                self._retire(fd)
+            self._fds.clear()
+
+class FrameCache:
+    """LRU cache of decoded frames bounded by a memory budget.
+
+    Frames are keyed by global frame index and cached as read-only
+    (traces, headers) arrays. Frames larger than the whole budget are never
+    cached.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get a cached (traces, headers) pair, or None"""
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, traces, headers):
+        """Cache a decoded frame, evicting least recently used frames"""
+        size = traces.nbytes + headers.nbytes
+        if size > self.max_bytes:
+            return traces, headers
+
+        # Own copies, so later writes to extents can't change cached frames
+        traces = np.array(traces)
+        headers = np.array(headers)
+        traces.setflags(write=False)
+        headers.setflags(write=False)
+
+        with self._lock:
+            self._discard(key)
+            self._frames[key] = (traces, headers)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (old_traces, old_headers) = self._frames.popitem(last=False)
+                self.nbytes -= old_traces.nbytes + old_headers.nbytes
+                self.evictions += 1
+        return traces, headers
+
+    def _discard(self, key):
+        entry = self._frames.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[0].nbytes + entry[1].nbytes
+
+    def invalidate(self, first, last=None):
+        """Drop cached frames first..last (inclusive)"""
+        last = first if last is None else last
+        with self._lock:
+            for key in [key for key in self._frames if first <= key <= last]:
+                self._discard(key)
+
+    def clear(self):
+        """Drop every cached frame"""
+        with self._lock:
+            self._frames.clear()
+            self.nbytes = 0
+
+    @property
+    def stats(self) -> Dict:
+        """Cache counters and current size"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'frames': len(self._frames),
+            'nbytes': self.nbytes,
+        }
+
 class ExtentManager:
-    """Manages reading from multiple extent files"""
-    def __init__(self, extent_paths, struct, trace_file_tree, trace_size=None):
+    """Manages reading from multiple extent files.
+
+    All reads and writes are positioned (pread/pwrite), so no file position
+    is shared and one manager can serve many threads.
+    """
+    def __init__(self, extent_paths, struct, trace_file_tree, trace_size=None, use_mmap=False, writable=False,
+                 executor=None, max_open_files=MAX_OPEN_FILES):
         self.extent_paths = extent_paths
         self.struct = struct
         self.trace_file_tree = trace_file_tree  # Single ElementTree for TraceFile
         self.trace_size = trace_size
-        self._cache = {}
+        self.use_mmap = use_mmap
+        self.writable = writable
+        self.executor = executor  # Thread pool for concurrent reads
+        self.max_open_files = max_open_files
+        self._maps = OrderedDict()  # extent_index -> memmap, least recently used first
+        self._maps_lock = threading.Lock()
+        self._read_pool = _HandlePool(extent_paths, os.O_RDONLY, max_open_files)
+        self._write_pool = _HandlePool(extent_paths, os.O_RDWR, max_open_files)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close file handles and drop memory maps"""
+        self._read_pool.close()
+        self._write_pool.close()
+        with self._maps_lock:
+            self._maps.clear()
             
     def __del__(self):
         """Clean up file handles"""
-        for handle in self._cache.values():
-            handle.close()
+        if hasattr(self, '_maps_lock'):
+            self.close()
             
+    def _traces_per_extent(self):
+        """Number of records in each extent, from VFIO_EXTSIZE"""
+        if not self.trace_size:
+            self.trace_size = self.struct.sizeof()
+
+        extent_size = int(JavaSeisXML.get(self.trace_file_tree, "VFIO_EXTSIZE", "0"))
+        traces_per_extent = extent_size // self.trace_size
+
+        if traces_per_extent <= 0:
+            raise ValueError("Invalid VFIO_EXTSIZE value: must hold at least one record")
+        return traces_per_extent
+
     def _get_extent_and_offset(self, index):
         """Calculate which extent file and offset contains the requested index"""
         if not self.trace_size:
             self.trace_size = self.struct.sizeof()
             
-        # Get VFIO_MAXPOS with safety checks
-        traces_per_extent = JavaSeisXML.get(self.trace_file_tree, "VFIO_MAXPOS", "0")
-        traces_per_extent = int(traces_per_extent)
-        
-        if traces_per_extent <= 0:
-            raise ValueError("Invalid VFIO_MAXPOS value: must be greater than 0")
-            
+        traces_per_extent = self._traces_per_extent()
         extent_index = index // traces_per_extent
         offset = (index % traces_per_extent) * self.trace_size
         
         return extent_index, offset
         
-    def _get_file_handle(self, extent_index):
-        """Get or create file handle for extent"""
-        if extent_index not in self._cache:
-            if extent_index >= len(self.extent_paths):
-                raise ValueError(f"Extent index {extent_index} out of range")
-            self._cache[extent_index] = open(self.extent_paths[extent_index], 'rb')
-        return self._cache[extent_index]
+    def _get_map(self, extent_index):
+        """Get or create read-only memory map for extent.
+
+        At most max_open_files maps are kept, least recently used first out,
+        as each map holds a file descriptor. An evicted map is unmapped once
+        no array returned from it is still referenced.
+        """
+        with self._maps_lock:
+            extent = self._maps.get(extent_index)
+            if extent is None:
+                if extent_index >= len(self.extent_paths):
+                    raise ValueError(f"Extent index {extent_index} out of range")
+                extent = np.memmap(self.extent_paths[extent_index], dtype=np.uint8, mode='r')
+                self._maps[extent_index] = extent
+                while len(self._maps) > self.max_open_files:
+                    self._maps.popitem(last=False)
+            else:
+                self._maps.move_to_end(extent_index)
+            return extent
+
+    def add_extents(self, extent_paths):
+        """Register extents created after the manager was opened"""
+        with self._maps_lock:
+            # The handle pools share this list
+            self.extent_paths.extend(extent_paths)
+
+    def release_map(self, extent_index):
+        """Drop the memory map of an extent that has grown since it was mapped"""
+        with self._maps_lock:
+            self._maps.pop(extent_index, None)
+
+    def _segments(self, start_index, count):
+        """Split a range of records into (extent_index, offset, count) segments"""
+        segments = []
+        index = start_index
+        end_index = start_index + count
+        while index < end_index:
+            extent_index, offset = self._get_extent_and_offset(index)
+            traces_per_extent = self._traces_per_extent()
+            n = min(end_index - index, traces_per_extent - index % traces_per_extent)
+            segments.append((extent_index, offset, n))
+            index += n
+        return segments
+
+    def _pread_array(self, start_index, count):
+        """Read a range of records with positioned reads.
+
+        The range is split at extent boundaries and into pieces of at most
+        READ_CHUNK_BYTES, and the pieces are read into one preallocated
+        buffer, concurrently when an executor is set.
+        """
+        data = np.empty((count, self.trace_size), dtype=np.uint8)
+        chunk = max(1, READ_CHUNK_BYTES // self.trace_size)
+
+        reads = []
+        row = 0
+        for extent_index, offset, n in self._segments(start_index, count):
+            for first in range(0, n, chunk):
+                nrows = min(chunk, n - first)
+                reads.append((extent_index, offset + first * self.trace_size, row, nrows))
+                row += nrows
+
+        def read(args):
+            extent_index, offset, row, nrows = args
+            with self._read_pool.acquire(extent_index) as fd:
+                _pread_into(fd, data[row:row + nrows], offset)
+
+        if self.executor is not None and len(reads) > 1:
+            list(self.executor.map(read, reads))
+        else:
+            for args in reads:
+                read(args)
+        return data
+
+    def read_array(self, start_index, count, dtype=None):
+        """Read a range of records as one contiguous array.
+
+        With use_mmap, each extent segment covered by the range is sliced out
+        of the extent map in one operation; a range inside a single extent is
+        returned as a zero-copy view and a range crossing extents is
+        concatenated. Otherwise the range is read with positioned reads.
+
+        Args:
+            start_index: First record to read
+            count: Number of records to read
+            dtype: Optional record dtype to view the result as
+        Returns:
+            np.ndarray: (count, trace_size) uint8 array, or (count,) array of dtype
+        """
+        if not self.trace_size:
+            self.trace_size = self.struct.sizeof()
+
+        if not self.use_mmap:
+            data = self._pread_array(start_index, count)
+            return data.view(dtype).reshape(count) if dtype is not None else data
+
+        blocks = []
+        for extent_index, offset, n in self._segments(start_index, count):
+            extent = self._get_map(extent_index)
+            block = extent[offset:offset + n * self.trace_size]
+            if block.size != n * self.trace_size:
+                raise ValueError(f"Extent {extent_index} is shorter than expected")
+            blocks.append(block)
+
+        if not blocks:
+            data = np.empty(0, dtype=np.uint8)
+        elif len(blocks) == 1:
+            data = blocks[0]
+        else:
+            data = np.concatenate(blocks)
+
+        if dtype is not None:
+            return data.view(dtype)
+        return data.reshape(count, self.trace_size)
         
+    def read_columns(self, start_index, count, columns):
+        """Read selected byte ranges of a range of records.
+
+        With use_mmap only the pages holding the requested ranges are
+        touched. Otherwise each extent segment is read in bulk with
+        _pread_array (on the executor when one is set) and the ranges are
+        sliced out in memory, as many small reads cost far more than the
+        extra bytes on parallel file systems.
+
+        Args:
+            start_index: First record to read
+            count: Number of records to read
+            columns: List of (begin, end) byte ranges within each record
+        Returns:
+            np.ndarray: (count, total width) uint8 array with the ranges side by side
+        """
+        if not self.trace_size:
+            self.trace_size = self.struct.sizeof()
+
+        width = sum(end - begin for begin, end in columns)
+        data = np.empty((count, width), dtype=np.uint8)
+        row = 0
+        index = start_index
+        for extent_index, offset, n in self._segments(start_index, count):
+            if self.use_mmap:
+                block = self._get_map(extent_index)[offset:offset + n * self.trace_size]
+                if block.size != n * self.trace_size:
+                    raise ValueError(f"Extent {extent_index} is shorter than expected")
+                block = block.reshape(n, self.trace_size)
+            else:
+                block = self._pread_array(index, n)
+            col = 0
+            for begin, end in columns:
+                data[row:row + n, col:col + end - begin] = block[:, begin:end]
+                col += end - begin
+            row += n
+            index += n
+        return data
+
+    def write_array(self, start_index, data):
+        """Write a block of encoded records to extents.
+
+        Every extent segment covered by the block is written with a single
+        positioned write, so no file position is shared between calls.
+
+        Args:
+            start_index: First record to write
+            data: (count, trace_size) uint8 array of encoded records
+        """
+        if not self.writable:
+            raise ValueError("Extents are opened read-only")
+
+        data = np.ascontiguousarray(data).view(np.uint8).reshape(-1, self.trace_size)
+        row = 0
+        for extent_index, offset, n in self._segments(start_index, data.shape[0]):
+            with self._write_pool.acquire(extent_index) as fd:
+                _pwrite_all(fd, data[row:row + n], offset)
+            row += n
+
+    def read_extent(self, extent_index, dtype):
+        """View a whole extent as an array of records.
+
+        Args:
+            extent_index: Extent to map
+            dtype: Record dtype
+        Returns:
+            np.memmap: Read-only view of every complete record in the extent
+        """
+        if os.path.getsize(self.extent_paths[extent_index]) == 0:
+            return np.empty(0, dtype=dtype)  # Empty files cannot be mapped
+        extent = self._get_map(extent_index)
+        nrecords = extent.size // dtype.itemsize
+        return extent[:nrecords * dtype.itemsize].view(dtype)
+
     def read_range(self, start_index, count):
         """Read a range of traces/headers from extents"""
         results = []
         
         for i in range(start_index, start_index + count):
             extent_index, offset = self._get_extent_and_offset(i)
-            handle = self._get_file_handle(extent_index)
-            handle.seek(offset)
-            data = handle.read(self.trace_size)
+            with self._read_pool.acquire(extent_index) as fd:
+                data = os.pread(fd, self.trace_size, offset)
             
             if data:
                 parsed = self.struct.parse(data)
@@ -93,15 +471,70 @@ class ExtentManager:
 class JavaSeis:
     """JavaSeis dataset reader/writer."""
     
-    def __init__(self):
-        """Initialize JavaSeis dataset."""
+    def __init__(self, use_mmap: bool = False, max_workers: int = None, max_open_files: int = MAX_OPEN_FILES,
+                 cache_bytes: int = 0):
+        """Initialize JavaSeis dataset.
+
+        A dataset may be shared between threads: every read is a positioned
+        read, and open extent files are held in a bounded LRU pool.
+
+        Args:
+            use_mmap: Memory-map extents and return numpy arrays from
+                get_traces/get_headers instead of lists of parsed records
+            max_workers: Read extents with positioned reads on a pool of this
+                many threads and decode traces in parallel chunks. Also
+                returns numpy arrays.
+            max_open_files: Most extent files kept open (or mapped) per extent manager
+            cache_bytes: Memory budget for an LRU cache of decoded frames
+                (requires use_mmap or max_workers, 0 disables the cache)
+        """
         self.xml = None
         self.header_manager = None
         self.trace_manager = None
+        self.use_mmap = use_mmap
+        self.max_workers = max_workers
+        self.max_open_files = max_open_files
+        self.array_io = use_mmap or max_workers is not None
+        self.executor = ThreadPoolExecutor(max_workers) if max_workers else None
+        self.writable = False
+        self.headers_writable = False
+        self._append_position = None  # Next frame for append_frame, found from the TraceMap
+
+        if cache_bytes and not self.array_io:
+            raise ValueError("The frame cache requires use_mmap or max_workers")
+        self.frame_cache = FrameCache(cache_bytes) if cache_bytes else None
+        self.indexes = {}
+
+    def __enter__(self):
+        return self
 
-    def load(self, path: str) -> None:
-        """Load existing JavaSeis dataset."""
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        """Close extent files and stop the reader thread pool"""
+        for manager in (self.header_manager, self.trace_manager):
+            if manager is not None:
+                manager.close()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def load(self, path: str, mode: str = 'r') -> None:
+        """Load existing JavaSeis dataset.
+
+        Args:
+            path: Dataset directory
+            mode: 'r' for read-only, 'r+' to also allow header updates with
+                write_headers/update_header_column (trace extents stay
+                read-only), or 'a' to write and append frames
+        """
+        if mode not in ('r', 'r+', 'a'):
+            raise ValueError(f"Unsupported mode: {mode}")
+        self.headers_writable = mode == 'r+'
+        self.writable = mode == 'a'
         self.path = Path(path)
+        self.indexes = {}
         logger.info(f"Loading JavaSeis dataset from: {self.path}")
         self._validate_js_dir()
         
@@ -118,13 +551,33 @@ class JavaSeis:
         
         logger.debug("Building trace struct from FileProperties.xml")
         self.trace_struct = build_trace_struct(self.xml["FileProperties"])
+        self.header_dtype = build_header_dtype(self.xml["FileProperties"])
+        self.trace_codec = build_trace_codec(self.xml["FileProperties"])
         
         # Map extents
         logger.debug("Mapping extents")
         self.map_extents()
+        self.load_map()
+
+    def create_new(self, samples: int = 1000, traces: int = 1000, frames: int = 100, volumes: int = None,
+                   extent_size: int = None, extent_count: int = None, secondary_paths: List[str] = None,
+                   trace_format: str = "COMPRESSED_INT16") -> None:
+        """Create a new JavaSeis dataset.
 
-    def create_new(self, samples: int = 1000, traces: int = 1000, frames: int = 100, volumes: int = None) -> None:
-        """Create a new JavaSeis dataset."""
+        Args:
+            samples: Number of samples per trace
+            traces: Number of traces per frame
+            frames: Number of frames per volume. Use 0 with a 3D dataset to
+                start empty and grow it with append_frame.
+            volumes: Number of volumes (adds a fourth axis if given)
+            extent_size: Target size in bytes of each TraceFile extent
+            extent_count: Number of extents to split the dataset into
+            secondary_paths: Extra directories to spread extents across. Extent
+                i is stored in folder i % (1 + len(secondary_paths)), where
+                folder 0 is the dataset directory itself.
+            trace_format: COMPRESSED_INT16, COMPRESSED_INT08 (half the size,
+                lower precision) or FLOAT (uncompressed, fastest to read and write)
+        """
         # Initialize XML structures from templates
         self.xml = {}
         template_map = {
@@ -141,59 +594,102 @@ class JavaSeis:
         fp_tree = self.xml["FileProperties"]
         
         # Set dimensions
-        JavaSeisXML.set(fp_tree, "DataDimensions", "3")
+        labels = ["TIME", "CROSSLINE", "INLINE"]
+        lengths = [samples, traces, frames]
+        if volumes is not None:
+            labels.append("VOLUME")
+            lengths.append(volumes)
+        ndim = len(lengths)
+        JavaSeisXML.set(fp_tree, "DataDimensions", str(ndim))
         
         # Set axis properties using multi-line formatting
-        JavaSeisXML.set(fp_tree, "AxisLabels", ["TIME", "CROSSLINE", "INLINE"], "string")
-        JavaSeisXML.set(fp_tree, "AxisUnits", ["milliseconds", "meters", "meters"], "string")
-        JavaSeisXML.set(fp_tree, "AxisDomains", ["time", "space", "space"], "string")
-        JavaSeisXML.set(fp_tree, "AxisLengths", [samples, traces, frames], "long")
-        JavaSeisXML.set(fp_tree, "LogicalOrigins", [0, 1, 1], "long")
-        JavaSeisXML.set(fp_tree, "LogicalDeltas", [1, 1, 1], "long")
-        JavaSeisXML.set(fp_tree, "PhysicalOrigins", [0.0, 0.0, 0.0], "double")
-        JavaSeisXML.set(fp_tree, "PhysicalDeltas", [1.0, 1.0, 1.0], "double")
+        JavaSeisXML.set(fp_tree, "AxisLabels", labels, "string")
+        JavaSeisXML.set(fp_tree, "AxisUnits", ["milliseconds"] + ["meters"] * (ndim - 1), "string")
+        JavaSeisXML.set(fp_tree, "AxisDomains", ["time"] + ["space"] * (ndim - 1), "string")
+        JavaSeisXML.set(fp_tree, "AxisLengths", lengths, "long")
+        JavaSeisXML.set(fp_tree, "LogicalOrigins", [0] + [1] * (ndim - 1), "long")
+        JavaSeisXML.set(fp_tree, "LogicalDeltas", [1] * ndim, "long")
+        JavaSeisXML.set(fp_tree, "PhysicalOrigins", [0.0] * ndim, "double")
+        JavaSeisXML.set(fp_tree, "PhysicalDeltas", [1.0] * ndim, "double")
         
         # Set other properties
         JavaSeisXML.set(fp_tree, "DataType", "UNSTACKED")
-        JavaSeisXML.set(fp_tree, "TraceFormat", "COMPRESSED_INT16")
+        JavaSeisXML.set(fp_tree, "TraceFormat", trace_format)
         JavaSeisXML.set(fp_tree, "ByteOrder", "LITTLE_ENDIAN")
         
-        # Calculate total number of traces
-        volumes = volumes or 1
-        total_traces = volumes * frames * traces
-        
-        # Update TraceFile and TraceHeaders XML
-        for xml_name in ['TraceFile', 'TraceHeaders']:
-            tree = self.xml[xml_name]
-            JavaSeisXML.set(tree, "VFIO_MAXFILE", "1")  # Single extent file
-            
-            # Calculate and set extent size
-            if xml_name == 'TraceFile':
-                # Calculate compression overhead
-                samples_padded = samples + (samples % 2)  # Pad to even number
-                windows = (samples - 1) // 100 + 1  # 100 samples per window
-                
-                # Size per trace:
-                # - 4 bytes per window scalar
-                # - 2 bytes per sample (padded to even)
-                bytes_per_trace = (4 * windows) + (2 * samples_padded)
-                
-                # Total size for all traces
-                extent_size = bytes_per_trace * traces * frames * volumes
-            else:
-                # For headers: header length * total traces
-                header_length = int(JavaSeisXML.get(fp_tree, "HeaderLengthBytes", "0"))
-                extent_size = header_length * traces
-                
-            JavaSeisXML.set(tree, "VFIO_EXTSIZE", str(extent_size))
-            JavaSeisXML.set(tree, "VFIO_MAXPOS", str(extent_size))  # Total traces
-        
         # Build header and trace structs
         self.header_struct = build_header_struct(self.xml["FileProperties"])
         self.trace_struct = build_trace_struct(self.xml["FileProperties"])
+        self.header_dtype = build_header_dtype(self.xml["FileProperties"])
+        self.trace_codec = build_trace_codec(self.xml["FileProperties"])
+
+        # Record secondary storage folders
+        secondary_paths = secondary_paths or []
+        vf_tree = self.xml["VirtualFolders"]
+        JavaSeisXML.set(vf_tree, "NDIR", str(1 + len(secondary_paths)), "int")
+        for i, folder in enumerate(secondary_paths, start=1):
+            JavaSeisXML.set(vf_tree, f"FILESYSTEM-{i}", f"{Path(folder).resolve()},READ_WRITE", "string")
+
+        # Extents always hold whole frames
+        total_frames = int(np.prod(lengths[2:]))
+        frame_bytes = self.trace_codec.trclen * traces
+        if extent_count:
+            frames_per_extent = -(-total_frames // extent_count)
+        elif extent_size:
+            frames_per_extent = extent_size // frame_bytes
+        else:
+            frames_per_extent = total_frames or APPEND_EXTENT_BYTES // frame_bytes
+        self._set_extent_properties(max(1, frames_per_extent))
+
+    def _set_extent_properties(self, frames_per_extent: int) -> None:
+        """Set VFIO_* properties in TraceFile.xml and TraceHeaders.xml.
+
+        VFIO_EXTSIZE is the size in bytes of one extent, VFIO_MAXFILE the
+        number of extents and VFIO_MAXPOS the total number of bytes. Trace and
+        header extents hold the same frames, so they split at the same traces.
+        """
+        axis_lengths = [int(x) for x in JavaSeisXML.get(self.xml["FileProperties"], "AxisLengths").split()]
+        traces_per_frame = axis_lengths[1]
+        total_frames = int(np.prod(axis_lengths[2:]))
+        nextents = -(-total_frames // frames_per_extent)
+
+        for xml_name, record_size in [('TraceFile', self.trace_codec.trclen),
+                                      ('TraceHeaders', self.header_dtype.itemsize)]:
+            tree = self.xml[xml_name]
+            JavaSeisXML.set(tree, "VFIO_EXTSIZE", str(record_size * traces_per_frame * frames_per_extent))
+            JavaSeisXML.set(tree, "VFIO_MAXFILE", str(nextents))
+            JavaSeisXML.set(tree, "VFIO_MAXPOS", str(record_size * traces_per_frame * total_frames))
+
+    def _frames_per_extent(self) -> int:
+        """Number of frames held by each extent"""
+        axis_lengths = [int(x) for x in JavaSeisXML.get(self.xml["FileProperties"], "AxisLengths").split()]
+        frame_bytes = self.trace_codec.trclen * axis_lengths[1]
+        return max(1, int(JavaSeisXML.get(self.xml["TraceFile"], "VFIO_EXTSIZE")) // frame_bytes)
+
+    def _extent_folders(self) -> List[Path]:
+        """Directories holding extents, primary dataset directory first"""
+        vf_tree = self.xml["VirtualFolders"]
+        folders = [self.path]
+        for i in range(1, int(JavaSeisXML.get(vf_tree, "NDIR", "1"))):
+            filesystem = JavaSeisXML.get(vf_tree, f"FILESYSTEM-{i}").split(",")[0]
+            folders.append(Path(filesystem) / self.path.name)
+        return folders
+
+    def _extent_paths(self, name: str) -> List[Path]:
+        """Paths to the extents of TraceFile or TraceHeaders"""
+        folders = self._extent_folders()
+        max_files = int(JavaSeisXML.get(self.xml[name], "VFIO_MAXFILE"))
+        return [folders[i % len(folders)] / f"{name}{i}" for i in range(max_files)]
 
     def map_extents(self) -> None:
         """Map trace headers and data extents."""
+        for manager in (self.header_manager, self.trace_manager):
+            if manager is not None:
+                manager.close()
+        # Cached frames belong to the extents being replaced
+        if self.frame_cache is not None:
+            self.frame_cache.clear()
+
         # Get dimensions and axis lengths from FileProperties
         fp_tree = self.xml["FileProperties"]
         logger.debug("Reading dimensions from FileProperties")
@@ -206,24 +702,30 @@ class JavaSeis:
         logger.debug(f"Parsed AxisLengths: {self.axis_lengths}")
         
         # Get paths to extent files
-        header_extents = []
-        trace_extents = []
-        max_files = int(JavaSeisXML.get(self.xml["TraceHeaders"], "VFIO_MAXFILE"))
-        for i in range(max_files):
-            header_extents.append(self.path / f"TraceHeaders{i}")
-            trace_extents.append(self.path / f"TraceFile{i}")
+        header_extents = self._extent_paths("TraceHeaders")
+        trace_extents = self._extent_paths("TraceFile")
             
         # Create extent managers with specific XML trees
         self.header_manager = ExtentManager(
             extent_paths=header_extents,
             struct=self.header_struct,
-            trace_file_tree=self.xml["TraceHeaders"]  # Pass specific tree
+            trace_file_tree=self.xml["TraceHeaders"],  # Pass specific tree
+            trace_size=self.header_dtype.itemsize,  # HeaderLengthBytes
+            use_mmap=self.use_mmap,
+            writable=self.writable or self.headers_writable,
+            executor=self.executor,
+            max_open_files=self.max_open_files
         )
         
         self.trace_manager = ExtentManager(
             extent_paths=trace_extents,
             struct=self.trace_struct,
-            trace_file_tree=self.xml["TraceFile"]  # Pass specific tree
+            trace_file_tree=self.xml["TraceFile"],  # Pass specific tree
+            trace_size=self.trace_codec.trclen,  # Includes odd-length padding
+            use_mmap=self.use_mmap,
+            writable=self.writable,
+            executor=self.executor,
+            max_open_files=self.max_open_files
         )
 
     def _validate_js_dir(self) -> None:
@@ -235,13 +737,402 @@ class JavaSeis:
             if not osp.exists(osp.join(self.path, fname)):
                 raise ValueError(f"Missing required file: {fname}")
 
-    def get_headers(self, start: int, count: int) -> List:
-        """Get a range of trace headers"""
+    def _trace_map_dtype(self) -> np.dtype:
+        """TraceMap entries are int32 in the dataset byte order"""
+        byte_order = JavaSeisXML.get(self.xml["FileProperties"], "ByteOrder")
+        return np.dtype('>i4' if byte_order == "BIG_ENDIAN" else '<i4')
+
+    def load_map(self) -> None:
+        """Load per-frame fold from the TraceMap file.
+
+        Datasets without a TraceMap are treated as fully populated.
+        """
+        nframes = self.axis_lengths[2]
+        nvolumes = int(np.prod(self.axis_lengths[3:])) if len(self.axis_lengths) > 3 else 1
+        trace_map_path = self.path / "TraceMap"
+
+        if trace_map_path.exists():
+            self.trace_map = np.fromfile(trace_map_path, dtype=self._trace_map_dtype()).astype(np.int32)
+        else:
+            logger.debug("No TraceMap found, assuming full fold")
+            self.trace_map = np.full(nframes * nvolumes, self.axis_lengths[1], dtype=np.int32)
+
+        self._append_position = None
+        if self.trace_map.size != nframes * nvolumes:
+            raise ValueError(f"TraceMap has {self.trace_map.size} entries, expected {nframes * nvolumes}")
+
+    def _frame_index(self, frame: int, volume: int = 0) -> int:
+        """Global frame index from zero-based frame and volume indices"""
+        nframes = self.axis_lengths[2]
+        if nframes == 0 or self.trace_map.size == 0:
+            raise IndexError(f"Frame index {frame} out of range of an empty dataset")
+        nvolumes = self.trace_map.size // nframes
+        if not 0 <= frame < nframes:
+            raise IndexError(f"Frame index {frame} out of range")
+        if not 0 <= volume < nvolumes:
+            raise IndexError(f"Volume index {volume} out of range")
+        return volume * nframes + frame
+
+    def get_fold(self, frame: int, volume: int = 0) -> int:
+        """Get number of live traces in a frame"""
+        return int(self.trace_map[self._frame_index(frame, volume)])
+
+    def read_frame(self, frame: int, volume: int = 0, samples: slice = None,
+                   time_range: Tuple[float, float] = None) -> Tuple:
+        """Read the live traces and headers of a frame.
+
+        Frame offsets are computed from AxisLengths and only the first `fold`
+        traces recorded in the TraceMap are read, so the dead padding of a
+        partially filled frame is never decoded.
+
+        Args:
+            frame: Zero-based frame index within the volume
+            volume: Zero-based volume index
+            samples: Contiguous slice of samples to read (default all)
+            time_range: (start, end) times on the physical time axis to read,
+                inclusive, as an alternative to samples
+        Returns:
+            tuple: (traces, headers) for the live traces in the frame
+        """
+        index = self._frame_index(frame, volume)
+        return self._read_frame_index(index, self._sample_slice(samples, time_range))
+
+    def _read_frame_index(self, index: int, samples: slice = None) -> Tuple:
+        """Read live traces and headers of a frame by global frame index"""
+        if self.frame_cache is not None:
+            cached = self.frame_cache.get(index)
+            if cached is not None:
+                traces, headers = cached
+                return (traces if samples is None else traces[:, samples]), headers
+        return self._load_frame(index, samples)
+
+    def _load_frame(self, index: int, samples: slice = None) -> Tuple:
+        """Read a frame from the extents, caching it when it is read whole"""
+        fold = int(self.trace_map[index])
+        start = index * self.axis_lengths[1]
+        traces = self._read_traces(start, fold, samples)
+        headers = self._read_headers(start, fold)
+
+        # Only whole frames are cached
+        if self.frame_cache is not None and samples is None:
+            return self.frame_cache.put(index, traces, headers)
+        return traces, headers
+
+    def _cached_range(self, start: int, count: int, samples: slice = None) -> Optional[Tuple]:
+        """Serve a range of traces from the frame cache if it lies in one frame's live traces.
+
+        The cache is looked up once. On a miss a whole-trace request loads
+        and caches the frame, while a sample window is left to a direct read.
+        """
+        if self.frame_cache is None or count <= 0:
+            return None
+        index, first = divmod(start, self.axis_lengths[1])
+        if index >= self.trace_map.size or first + count > self.trace_map[index]:
+            return None
+        cached = self.frame_cache.get(index)
+        if cached is not None:
+            traces, headers = cached
+        elif samples is None:
+            traces, headers = self._load_frame(index)
+        else:
+            return None
+        if samples is not None:
+            traces = traces[:, samples]
+        return traces[first:first + count], headers[first:first + count]
+
+    def _sample_slice(self, samples: slice = None, time_range: Tuple[float, float] = None) -> Optional[slice]:
+        """Resolve samples/time_range arguments to a sample slice, None for whole traces"""
+        nsamples = self.axis_lengths[0]
+        if time_range is not None:
+            if samples is not None:
+                raise ValueError("Give either samples or time_range, not both")
+            fp_tree = self.xml["FileProperties"]
+            origin = float(JavaSeisXML.get(fp_tree, "PhysicalOrigins").split()[0])
+            delta = float(JavaSeisXML.get(fp_tree, "PhysicalDeltas").split()[0])
+            first = max(0, int(np.ceil((time_range[0] - origin) / delta)))
+            last = min(nsamples - 1, int(np.floor((time_range[1] - origin) / delta)))
+            samples = slice(first, last + 1)
+        if samples is None:
+            return None
+
+        start, stop, step = samples.indices(nsamples)
+        if step != 1 or stop <= start:
+            raise ValueError(f"Sample range must be a non-empty contiguous range, got {samples}")
+        if (start, stop) == (0, nsamples):
+            return None
+        return slice(start, stop)
+
+    def iter_frames(self, samples: slice = None, time_range: Tuple[float, float] = None):
+        """Iterate over every frame that has live traces.
+
+        Args:
+            samples: Contiguous slice of samples to read (default all)
+            time_range: (start, end) times to read, as in read_frame
+        Yields:
+            tuple: (volume, frame, traces, headers)
+        """
+        samples = self._sample_slice(samples, time_range)
+        nframes = self.axis_lengths[2]
+        for index in np.flatnonzero(self.trace_map > 0):
+            volume, frame = divmod(int(index), nframes)
+            traces, headers = self._read_frame_index(int(index), samples)
+            yield volume, frame, traces, headers
+
+    def get_headers(self, start: int, count: int):
+        """Get a range of trace headers
+
+        Returns a structured array (a zero-copy view in mmap mode when the
+        range lies in one extent) with array I/O, otherwise a list of parsed
+        headers. Header reads bypass the frame cache, so a header scan never
+        decodes traces.
+        """
+        return self._read_headers(start, count)
+
+    def _read_headers(self, start: int, count: int):
+        """Read a range of trace headers from the extents"""
+        if self.array_io:
+            return self.header_manager.read_array(start, count, dtype=self.header_dtype)
         return self.header_manager.read_range(start, count)
         
-    def get_traces(self, start: int, count: int) -> List:
-        """Get a range of traces"""
-        return self.trace_manager.read_range(start, count)
+    def get_traces(self, start: int, count: int, samples: slice = None,
+                   time_range: Tuple[float, float] = None):
+        """Get a range of traces
+
+        Returns a (count, nsamples) float32 array with array I/O, otherwise
+        a list of decoded traces.
+
+        Args:
+            start: Index of the first trace
+            count: Number of traces
+            samples: Contiguous slice of samples to read (default all). Only
+                the compression windows covering the slice are read and decoded.
+            time_range: (start, end) times on the physical time axis to read,
+                inclusive, as an alternative to samples
+        """
+        samples = self._sample_slice(samples, time_range)
+        cached = self._cached_range(start, count, samples)
+        if cached is not None:
+            return cached[0]
+        return self._read_traces(start, count, samples)
+
+    def _read_traces(self, start: int, count: int, samples: slice = None):
+        """Read and decode a range of traces from the extents"""
+        if not self.array_io:
+            traces = self.trace_manager.read_range(start, count)
+            return traces if samples is None else [trace[samples] for trace in traces]
+        if samples is None:
+            return self._decode_traces(self.trace_manager.read_array(start, count))
+
+        raw = self.trace_manager.read_columns(start, count, self.trace_codec.sample_columns(samples))
+        return self._decode_traces(raw, samples)
+
+    def _decode_traces(self, raw: np.ndarray, samples: slice = None) -> np.ndarray:
+        """Decode a block of raw traces, in parallel chunks when a pool is set"""
+        count = raw.shape[0]
+        if samples is None:
+            decode_block = lambda block: self.trace_codec.decode(block, block.shape[0])
+            nsamples = self.trace_codec.nsamples
+        else:
+            decode_block = lambda block: self.trace_codec.decode_columns(block, samples)
+            nsamples = samples.stop - samples.start
+
+        if self.executor is None or count < 2 * self.max_workers:
+            return decode_block(raw)
+
+        # numpy releases the GIL, so chunks decode concurrently
+        traces = np.empty((count, nsamples), dtype=np.float32)
+        step = -(-count // self.max_workers)
+
+        def decode(first):
+            traces[first:first + step] = decode_block(raw[first:first + step])
+
+        list(self.executor.map(decode, range(0, count, step)))
+        return traces
+
+    def to_dask(self, frames_per_chunk: int = 1) -> Tuple:
+        """Lazy dask arrays of the traces and headers, chunked by frame.
+
+        Shapes follow AxisLengths in reverse, e.g. (volumes, frames, traces,
+        samples) for a 4D dataset, and each chunk holds frames_per_chunk
+        frames of one volume. Trace chunks read only the trace extents and
+        header chunks only the header extents. Traces and headers past a
+        frame's fold are zero. Requires use_mmap or max_workers.
+
+        Args:
+            frames_per_chunk: Number of frames in each chunk
+        Returns:
+            tuple: (traces, headers) dask arrays, float32 and the header dtype
+        """
+        import dask.array as da
+
+        if not self.array_io:
+            raise ValueError("to_dask requires use_mmap or max_workers")
+        if frames_per_chunk < 1:
+            raise ValueError(f"frames_per_chunk must be positive, got {frames_per_chunk}")
+
+        nsamples, ntraces, nframes = self.axis_lengths[:3]
+        volume_shape = tuple(self.axis_lengths[:2:-1])
+        frame_chunks = tuple(min(frames_per_chunk, nframes - first)
+                             for first in range(0, nframes, frames_per_chunk)) or (0,)
+        chunks = tuple((1,) * n for n in volume_shape) + (frame_chunks, (ntraces,))
+
+        def frame_group(block_id):
+            """Global frame indices of a chunk"""
+            nvolume_axes = len(volume_shape)
+            volume = int(np.ravel_multi_index(block_id[:nvolume_axes], volume_shape)) if volume_shape else 0
+            first = block_id[nvolume_axes] * frames_per_chunk
+            return [volume * nframes + frame for frame in range(first, min(first + frames_per_chunk, nframes))]
+
+        def read_traces(block_id=None):
+            frames = frame_group(block_id)
+            block = np.zeros((len(frames), ntraces, nsamples), dtype=np.float32)
+            for i, index in enumerate(frames):
+                fold = int(self.trace_map[index])
+                if fold > 0:
+                    block[i, :fold] = self._read_traces(index * ntraces, fold)
+            return block.reshape((1,) * len(volume_shape) + block.shape)
+
+        def read_headers(block_id=None):
+            frames = frame_group(block_id)
+            block = np.zeros((len(frames), ntraces), dtype=self.header_dtype)
+            for i, index in enumerate(frames):
+                fold = int(self.trace_map[index])
+                if fold > 0:
+                    block[i, :fold] = self._read_headers(index * ntraces, fold)
+            return block.reshape((1,) * len(volume_shape) + block.shape)
+
+        traces = da.map_blocks(read_traces, chunks=chunks + ((nsamples,),), dtype=np.float32,
+                               meta=np.empty((0,) * (len(chunks) + 1), dtype=np.float32))
+        headers = da.map_blocks(read_headers, chunks=chunks, dtype=self.header_dtype,
+                                meta=np.empty((0,) * len(chunks), dtype=self.header_dtype))
+        return traces, headers
+
+    def iter_header_extents(self):
+        """Iterate over header extents as structured arrays.
+
+        Each TraceHeaders extent is viewed through the compiled header dtype
+        in one memory map, which is the fastest way to scan every header in a
+        dataset. Records past the last written trace are included.
+        """
+        for extent_index in range(len(self.header_manager.extent_paths)):
+            yield self.header_manager.read_extent(extent_index, self.header_dtype)
+
+    def _index_path(self, key: str) -> Path:
+        """Path of the sidecar index file for a header key"""
+        return self.path / f"TraceIndex-{key}.npy"
+
+    def build_index(self, key: str) -> np.ndarray:
+        """Build and save a sorted index of a header key over the live traces.
+
+        Scans the TraceHeaders extents once and writes a sidecar file of
+        (value, position) records sorted by value to the dataset directory.
+
+        Args:
+            key: Header label to index
+        Returns:
+            np.ndarray: Structured array with 'value' and 'position' fields
+        """
+        if key not in self.header_dtype.names:
+            raise ValueError(f"Unknown header: {key}")
+        field = self.header_dtype.fields[key][0]
+        if field.shape:
+            raise ValueError(f"Cannot index multi-element header: {key}")
+
+        # Extents may be short when their last frames are not full
+        total = self.trace_map.size * self.axis_lengths[1]
+        per_extent = self.header_manager._traces_per_extent()
+        values = np.zeros(total, dtype=field)
+        for extent_index, extent in enumerate(self.iter_header_extents()):
+            first = extent_index * per_extent
+            count = min(extent.size, max(0, total - first))
+            values[first:first + count] = extent[key][:count]
+        ntraces = self.axis_lengths[1]
+        live = np.arange(ntraces)[np.newaxis, :] < self.trace_map[:, np.newaxis]
+        positions = np.flatnonzero(live.ravel())
+
+        values = values[positions]
+        order = np.argsort(values, kind='stable')
+        index = np.empty(positions.size, dtype=[('value', field.newbyteorder('=')), ('position', '<i8')])
+        index['value'] = values[order]
+        index['position'] = positions[order]
+
+        np.save(self._index_path(key), index)
+        self.indexes[key] = index
+        return index
+
+    def get_index(self, key: str) -> np.ndarray:
+        """Get the sorted index of a header key, loading or building it as needed"""
+        if key not in self.indexes:
+            index_path = self._index_path(key)
+            if index_path.exists():
+                self.indexes[key] = np.load(index_path)
+            else:
+                self.build_index(key)
+        return self.indexes[key]
+
+    def _drop_indexes(self, keys: List[str] = None) -> None:
+        """Remove header indexes made stale by a write.
+
+        Args:
+            keys: Header labels whose values were written (default every
+                index, for writes of whole headers or of the TraceMap)
+        """
+        if keys is None:
+            self.indexes.clear()
+            index_paths = list(self.path.glob("TraceIndex-*.npy"))
+        else:
+            for key in keys:
+                self.indexes.pop(key, None)
+            index_paths = [self._index_path(key) for key in keys]
+        # Concurrent writers may remove the same file
+        for index_path in index_paths:
+            index_path.unlink(missing_ok=True)
+
+    def find(self, **criteria) -> np.ndarray:
+        """Find trace positions by header values using the sidecar indexes.
+
+        Args:
+            criteria: Header label mapped to a value, or to an inclusive
+                (low, high) range, e.g. find(R_LINE=12, SRF_SLOC=(100, 200))
+        Returns:
+            np.ndarray: Sorted positions of the live traces matching every criterion
+        """
+        if not criteria:
+            raise ValueError("No selection criteria given")
+
+        positions = None
+        for key, value in criteria.items():
+            index = self.get_index(key)
+            low, high = value if isinstance(value, tuple) else (value, value)
+            first = np.searchsorted(index['value'], low, side='left')
+            last = np.searchsorted(index['value'], high, side='right')
+            matches = np.sort(index['position'][first:last])
+            positions = matches if positions is None else np.intersect1d(positions, matches, assume_unique=True)
+        return positions
+
+    def select(self, **criteria) -> Tuple:
+        """Read the traces and headers matching header values.
+
+        Matching positions come from the sidecar indexes (see find) and
+        consecutive positions are read as one range.
+
+        Args:
+            criteria: Header label mapped to a value or an inclusive (low, high) range
+        Returns:
+            tuple: (traces, headers) in trace position order
+        """
+        positions = self.find(**criteria)
+        breaks = np.flatnonzero(np.diff(positions) != 1) + 1
+        runs = [(int(run[0]), run.size) for run in np.split(positions, breaks) if run.size]
+
+        traces = [self.get_traces(start, count) for start, count in runs]
+        headers = [self.get_headers(start, count) for start, count in runs]
+        if not self.array_io:
+            return [t for block in traces for t in block], [h for block in headers for h in block]
+        if not runs:
+            return (np.empty((0, self.trace_codec.nsamples), dtype=np.float32),
+                    np.empty(0, dtype=self.header_dtype))
+        return np.concatenate(traces), np.concatenate(headers)
 
     def add_header(self, label: str, description: str, format: str, 
                   element_count: int = 1, byte_offset: int = None) -> None:
@@ -269,16 +1160,13 @@ class JavaSeis:
         if props:
             # Find max entry number
             entry_num = max(int(p.get("name").split("_")[1]) for p in props if p.get("name").startswith("entry_")) + 1
-            # Find max offset + size of last property
-            last_offset = max(int(JavaSeisXML.get(p, "byteOffset", "0")) for p in props)
-            last_prop = max(props, key=lambda p: int(JavaSeisXML.get(p, "byteOffset", "0")))
-            last_size = 4  # Default size
-            if JavaSeisXML.get(last_prop, "format") == "DOUBLE":
-                last_size = 8
-            byte_offset = last_offset + last_size
         else:
             entry_num = 1
-            byte_offset = 0
+
+        # Append after the existing header record unless an offset is given
+        current_length = build_header_dtype(fp_tree).itemsize if props else 0
+        if byte_offset is None:
+            byte_offset = current_length
                 
         # Create new property as parset under TraceProperties
         new_prop = ET.SubElement(trace_props, "parset")
@@ -299,20 +1187,15 @@ class JavaSeis:
         
         # Update HeaderLengthBytes in FileProperties
         format_sizes = {"INTEGER": 4, "FLOAT": 4, "DOUBLE": 8, "LONG": 8}
-        header_length = byte_offset + format_sizes[format] * element_count
+        header_length = max(current_length, byte_offset + format_sizes[format] * element_count)
         JavaSeisXML.set(fp_tree, "HeaderLengthBytes", str(header_length))
         
-        # Update TraceHeaders.xml
-        th_tree = self.xml["TraceHeaders"]
-        # Update VFIO_EXTSIZE to match total header size * number of traces
-        axis_lengths = [int(x) for x in JavaSeisXML.get(fp_tree, "AxisLengths").split()]
-        total_traces = axis_lengths[1] * axis_lengths[2]  # traces * frames
-        total_header_size = header_length * total_traces
-        JavaSeisXML.set(th_tree, "VFIO_EXTSIZE", str(total_header_size))
-        JavaSeisXML.set(th_tree, "VFIO_MAXPOS", str(total_header_size))
-        
         # Rebuild header struct after adding new header
         self.header_struct = build_header_struct(self.xml["FileProperties"])
+        self.header_dtype = build_header_dtype(self.xml["FileProperties"])
+
+        # Header extents grow with the header length
+        self._set_extent_properties(self._frames_per_extent())
 
     def save(self, path: str = None) -> None:
         """Save/overwrite JavaSeis XML files.
@@ -322,15 +1205,12 @@ class JavaSeis:
         """
         if path is not None:
             self.path = Path(path)
+        self.indexes = {}
         
         # Create directory if it doesn't exist
         self.path.mkdir(parents=True, exist_ok=True)
         
-        # Save XML files
-        for key, xml_tree in self.xml.items():
-            xml_path = self.path / f"{key}.xml"
-            logger.debug(f"Saving XML file: {xml_path}")
-            JavaSeisXML.save(xml_tree, xml_path)
+        self._save_xml()
         
         # Create trace map file
         logger.debug("Creating trace map file")
@@ -338,24 +1218,27 @@ class JavaSeis:
         
         # Create extent files first
         logger.debug("Creating extent files")
-        trace_file_path = self.path / "TraceFile0"
-        header_file_path = self.path / "TraceHeaders0"
-        
-        # Calculate sizes from XML
-        trace_size = self.trace_struct.sizeof()
-        header_size = self.header_struct.sizeof()
-        total_traces = int(JavaSeisXML.get(self.xml["TraceFile"], "VFIO_MAXPOS"))
-        
-        # Pre-allocate files with correct sizes
-        with open(trace_file_path, 'wb') as f:
-            f.truncate(trace_size * total_traces)
-        with open(header_file_path, 'wb') as f:
-            f.truncate(header_size * total_traces)
+        for name in ["TraceFile", "TraceHeaders"]:
+            extent_size = int(JavaSeisXML.get(self.xml[name], "VFIO_EXTSIZE"))
+            total_size = int(JavaSeisXML.get(self.xml[name], "VFIO_MAXPOS"))
+            for i, extent_path in enumerate(self._extent_paths(name)):
+                extent_path.parent.mkdir(parents=True, exist_ok=True)
+                # Pre-allocate files with correct sizes, last extent may be short
+                with open(extent_path, 'wb') as f:
+                    f.truncate(min(extent_size, total_size - i * extent_size))
         
         # Map extents after creating files
         logger.debug("Mapping extents")
+        self.writable = True
         self.map_extents()
 
+    def _save_xml(self) -> None:
+        """Write the XML files to the dataset directory"""
+        for key, xml_tree in self.xml.items():
+            xml_path = self.path / f"{key}.xml"
+            logger.debug(f"Saving XML file: {xml_path}")
+            JavaSeisXML.save(xml_tree, xml_path)
+
     def create_map(self):
         """Create and initialize the TraceMap file.
         
@@ -385,11 +1268,12 @@ class JavaSeis:
         
         # Create array for all volumes
         total_frames = nframes * nvolumes
-        array = np.full(total_frames, fold, dtype=np.int32)  # Must be int32 for 4-byte integers
+        self.trace_map = np.full(total_frames, fold, dtype=np.int32)  # Must be int32 for 4-byte integers
+        self._append_position = None
         
-        # Write to file in native byte order
+        # Write to file in the dataset byte order
         logger.debug(f"Creating TraceMap with {total_frames} frames ({nframes} frames x {nvolumes} volumes)")
-        array.tofile(trace_map_path)
+        self.trace_map.astype(self._trace_map_dtype()).tofile(trace_map_path)
 
         # Create Status.properties
         status_path = self.path / "Status.properties"
@@ -407,7 +1291,7 @@ class JavaSeis:
             f.write(f"DescriptiveName={description}\n")
 
     def write_trace(self, trace_data: np.ndarray, headers: dict, trace_file, header_file):
-        """Write a single trace and its headers to files using Construct.
+        """Write a single trace and its headers to files.
         
         Args:
             trace_data: Numpy array of trace samples
@@ -415,28 +1299,215 @@ class JavaSeis:
             trace_file: Open file handle for trace data
             header_file: Open file handle for headers
         """
-        # Write header using the header struct
-        header_bytes = self.header_struct.build(headers)
-        header_file.write(header_bytes)
-        
-        # Build trace data using the trace struct
-        compressed = self.trace_struct._encode(trace_data, None, None)
-        
-        # Calculate expected sizes
-        windowln = 100
-        nsamples = len(trace_data)
-        nwindows = floor((nsamples - 1.0) / windowln) + 1
+        # Pack header into a record laid out by the header dtype
+        record = np.zeros(1, dtype=self.header_dtype)
+        for name in self.header_dtype.names:
+            if name in headers:
+                record[name] = headers[name]
+        header_file.write(record.tobytes())
         
-        # Write scalars (ensure little-endian float32)
-        scalars = compressed.scalars.astype('<f4')  # float32 little-endian
-        trace_file.write(scalars.tobytes())
-        
-        # Write samples (ensure little-endian uint16 and padding)
-        samples = compressed.samples.astype('<u2')  # uint16 little-endian
-        if len(trace_data) % 2 != 0:
-            # Pad with an extra sample for odd lengths
-            samples = np.append(samples, np.uint16(32767))
-        
-        trace_file.write(samples.tobytes())
+        # Encode the trace in the dataset TraceFormat, including padding
+        trace_file.write(self.trace_codec.encode(trace_data).tobytes())
+
+    
+    def _pack_headers(self, headers) -> np.ndarray:
+        """Pack a structured array into records of the dataset header dtype"""
+        if isinstance(headers, np.ndarray) and headers.dtype == self.header_dtype:
+            return np.ascontiguousarray(headers)
+
+        packed = np.zeros(len(headers), dtype=self.header_dtype)
+        for name in headers.dtype.names:
+            if name in self.header_dtype.names:
+                packed[name] = headers[name]
+        return packed
+
+    def write_traces(self, start: int, traces: np.ndarray, headers: np.ndarray) -> None:
+        """Write a block of traces and headers at a linear trace position.
+
+        Traces are encoded with the batch codec and headers are packed from a
+        structured array (fields missing from it are written as zero), then
+        each extent region is written with a single positioned write.
+
+        Args:
+            start: Index of the first trace to write
+            traces: (ntraces, nsamples) array of trace samples
+            headers: Structured array of ntraces headers
+        """
+        self._write_block(start, traces, headers)
+        self._invalidate_traces(start, len(headers))
+
+    def _write_block(self, start: int, traces: np.ndarray, headers: np.ndarray) -> None:
+        """Encode and write traces and headers without invalidating caches or indexes"""
+        if not self.writable:
+            raise ValueError("Dataset is opened read-only")
+
+        traces = np.asarray(traces, dtype=np.float32)
+        if traces.ndim != 2 or traces.shape[1] != self.trace_codec.nsamples:
+            raise ValueError(f"Expected traces of shape (ntraces, {self.trace_codec.nsamples}), got {traces.shape}")
+        if len(headers) != traces.shape[0]:
+            raise ValueError(f"Got {len(headers)} headers for {traces.shape[0]} traces")
+
+        self.trace_manager.write_array(start, self.trace_codec.encode(traces))
+        self.header_manager.write_array(start, self._pack_headers(headers))
+
+    def write_headers(self, start: int, headers: np.ndarray) -> None:
+        """Overwrite a block of trace headers in place.
+
+        Only the TraceHeaders extents are written, with one positioned write
+        per extent region. Works on datasets loaded with mode='r+'.
+
+        Args:
+            start: Index of the first trace
+            headers: Structured array of headers (fields missing from it are
+                written as zero)
+        """
+        if not self.header_manager.writable:
+            raise ValueError("Dataset headers are opened read-only")
+
+        # Every header word is rewritten, so every index is stale
+        self.header_manager.write_array(start, self._pack_headers(headers))
+        self._invalidate_traces(start, len(headers))
+
+    def update_header_column(self, name: str, values: np.ndarray, start: int = 0) -> None:
+        """Overwrite one header word for a range of traces.
+
+        Headers are read, patched and written back in chunks of at most
+        READ_CHUNK_BYTES, so other header words are preserved and memory use
+        stays bounded however large the dataset is.
+
+        Args:
+            name: Header label
+            values: Values for traces start .. start + len(values) - 1
+            start: Index of the first trace
+        """
+        if not self.header_manager.writable:
+            raise ValueError("Dataset headers are opened read-only")
+        if name not in self.header_dtype.names:
+            raise ValueError(f"Unknown header: {name}")
+
+        values = np.asarray(values)
+        chunk = max(1, READ_CHUNK_BYTES // self.header_dtype.itemsize)
+        for first in range(0, len(values), chunk):
+            block = values[first:first + chunk]
+            headers = np.array(self.header_manager.read_array(start + first, len(block), dtype=self.header_dtype))
+            headers[name] = block
+            self.header_manager.write_array(start + first, headers)
+        self._invalidate_traces(start, len(values), keys=[name])
+
+    def _invalidate_traces(self, start: int, count: int, keys: List[str] = None) -> None:
+        """Drop cached frames and header indexes touched by a write to a range of traces.
+
+        Args:
+            start: Index of the first trace written
+            count: Number of traces written
+            keys: Header labels written (default every header)
+        """
+        if self.frame_cache is not None and count > 0:
+            ntraces = self.axis_lengths[1]
+            self.frame_cache.invalidate(start // ntraces, (start + count - 1) // ntraces)
+        self._drop_indexes(keys)
+
+    def write_frame(self, frame: int, traces: np.ndarray, headers: np.ndarray, volume: int = 0) -> None:
+        """Write a whole frame and record its fold in the TraceMap.
+
+        Args:
+            frame: Zero-based frame index within the volume
+            traces: (fold, nsamples) array of live traces for the frame
+            headers: Structured array of fold headers
+            volume: Zero-based volume index
+        """
+        index = self._frame_index(frame, volume)
+        fold = len(traces)
+        if fold > self.axis_lengths[1]:
+            raise ValueError(f"Frame holds at most {self.axis_lengths[1]} traces, got {fold}")
+
+        # set_fold invalidates the frame and the indexes once for the whole write
+        self._write_block(index * self.axis_lengths[1], traces, headers)
+        self.set_fold(frame, fold, volume)
+
+    def set_fold(self, frame: int, fold: int, volume: int = 0) -> None:
+        """Update the TraceMap fold for a frame"""
+        if not self.writable:
+            raise ValueError("Dataset is opened read-only")
+
+        index = self._frame_index(frame, volume)
+        self.trace_map[index] = fold
+        if self.frame_cache is not None:
+            self.frame_cache.invalidate(index)
+        self._drop_indexes()
+        entry = np.array([fold], dtype=self._trace_map_dtype())
+        fd = os.open(self.path / "TraceMap", os.O_RDWR)
+        try:
+            _pwrite_all(fd, entry, index * entry.itemsize)
+        finally:
+            os.close(fd)
+
+    def append_frame(self, traces: np.ndarray, headers: np.ndarray) -> int:
+        """Append a frame after the last frame of the dataset.
+
+        The last axis grows as frames arrive: the frame axis of a 3D dataset,
+        or the volume axis of a 4D one (frames of a new volume that have not
+        been appended yet have zero fold). AxisLengths, VFIO_MAXPOS,
+        VFIO_MAXFILE and the TraceMap are updated on disk with every frame,
+        and new extents are created as the current ones fill, so the dataset
+        can be read at any point during ingestion.
+
+        Args:
+            traces: (fold, nsamples) array of live traces for the frame
+            headers: Structured array of fold headers
+        Returns:
+            int: Global index of the appended frame
+        """
+        if not self.writable:
+            raise ValueError("Dataset is opened read-only")
+        ntraces = self.axis_lengths[1]
+        if len(traces) > ntraces:
+            raise ValueError(f"Frame holds at most {ntraces} traces, got {len(traces)}")
+
+        # Append after the last live frame
+        if self._append_position is None:
+            live = np.flatnonzero(self.trace_map > 0)
+            self._append_position = int(live[-1]) + 1 if live.size else 0
+        index = self._append_position
+        if index >= self.trace_map.size:
+            self._grow_last_axis()
+
+        self._write_block(index * ntraces, traces, headers)
+        extent_index = index // self._frames_per_extent()
+        for manager in (self.trace_manager, self.header_manager):
+            manager.release_map(extent_index)
+
+        volume, frame = divmod(index, self.axis_lengths[2])
+        self.set_fold(frame, len(traces), volume)
+        self._append_position = index + 1
+        return index
+
+    def _grow_last_axis(self) -> None:
+        """Add one frame (3D) or one volume (4D) and extend extents and TraceMap"""
+        fp_tree = self.xml["FileProperties"]
+        frames_per_extent = self._frames_per_extent()
+        old_frames = self.trace_map.size
+
+        self.axis_lengths[-1] += 1
+        JavaSeisXML.set(fp_tree, "AxisLengths", self.axis_lengths, "long")
+        self._set_extent_properties(frames_per_extent)
+
+        # Zero fold for the new frames, the appended frame's fold is set after writing
+        new_frames = int(np.prod(self.axis_lengths[2:])) - old_frames
+        entries = np.zeros(new_frames, dtype=self._trace_map_dtype())
+        fd = os.open(self.path / "TraceMap", os.O_RDWR)
+        try:
+            _pwrite_all(fd, entries, old_frames * entries.itemsize)
+        finally:
+            os.close(fd)
+        self.trace_map = np.append(self.trace_map, np.zeros(new_frames, dtype=np.int32))
+
+        # Extents are created empty and grow with each positioned write
+        for name, manager in (("TraceFile", self.trace_manager), ("TraceHeaders", self.header_manager)):
+            paths = self._extent_paths(name)
+            for extent_path in paths[len(manager.extent_paths):]:
+                extent_path.parent.mkdir(parents=True, exist_ok=True)
+                extent_path.touch()
+            manager.add_extents(paths[len(manager.extent_paths):])
 
-    
\ No newline at end of file
+        self._save_xml()
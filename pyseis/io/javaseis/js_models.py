@@ -7,7 +7,6 @@ from construct import *
 import numpy as np
 from math import floor
 import logging
-from .xml_io import JavaSeisXML
 
 logger = logging.getLogger(__name__)
 
@@ -81,10 +80,243 @@ class CompressedInt16Adapter(Adapter):
             samples=samples
         )
 
-def build_trace_struct(file_props_tree) -> Struct:
-    """Build trace struct for COMPRESSED_INT16 format"""
+class WindowedCodec:
+    """Batch codec for JavaSeis window-compressed traces.
+
+    A trace record holds one float32 scalar per 100-sample window followed
+    by the samples as offset-binary unsigned integers, padded to a whole
+    number of words. Works on whole blocks of traces at once: every trace is
+    padded out to a whole number of windows and reshaped to
+    (ntraces, nwindows, windowln), so scaling is a single broadcast instead
+    of a Python loop per window.
+
+    Subclasses set the sample word (sample_code), the scale applied to the
+    window maximum (sample_scale), the zero level (sample_offset) and the
+    sample count multiple records are padded to (sample_padding).
+    """
+    sample_code = 'u2'
+    sample_scale = 32766.0
+    sample_offset = 32767
+    sample_padding = 2
+
+    def __init__(self, nsamples, byte_order='little'):
+        self.windowln = 100
+        self.nsamples = nsamples
+        self.nwindows = floor((nsamples - 1.0) / self.windowln) + 1
+        self.byte_order = '<' if byte_order == 'little' else '>'
+        self.scalar_dtype = np.dtype(self.byte_order + 'f4')
+        self.sample_dtype = np.dtype(self.byte_order + self.sample_code)
+        self.sample_bytes = self.sample_dtype.itemsize
+
+        # Samples are padded to a whole number of words on disk
+        self.nsamples_padded = -(-nsamples // self.sample_padding) * self.sample_padding
+        self.trclen = 4 * self.nwindows + self.sample_bytes * self.nsamples_padded
+
+    def decode(self, buffer, ntraces=None):
+        """Decode compressed traces to float32.
+
+        Args:
+            buffer: Bytes-like object or uint8 array of shape (ntraces, trclen)
+            ntraces: Number of traces (inferred from the buffer if None)
+        Returns:
+            np.ndarray: (ntraces, nsamples) float32 array
+        """
+        raw = np.frombuffer(buffer, dtype=np.uint8) if not isinstance(buffer, np.ndarray) else buffer
+        if ntraces is None:
+            ntraces = raw.size // self.trclen
+        raw = raw.reshape(ntraces, self.trclen)
+        return self._decode_windows(raw[:, :4 * self.nwindows], raw[:, 4 * self.nwindows:], self.nsamples)
+
+    def _sample_range(self, samples):
+        """Resolve a sample slice to (start, stop, first_window, last_window)"""
+        start, stop, step = samples.indices(self.nsamples)
+        if step != 1 or stop <= start:
+            raise ValueError(f"Sample slice must be a non-empty contiguous range, got {samples}")
+        return start, stop, start // self.windowln, (stop - 1) // self.windowln + 1
+
+    def sample_columns(self, samples):
+        """Byte ranges of each trace record needed to decode a sample slice.
+
+        Args:
+            samples: Contiguous slice of samples
+        Returns:
+            list: (begin, end) byte ranges for the window scalars and the
+            sample words of every window overlapping the slice
+        """
+        start, stop, w0, w1 = self._sample_range(samples)
+        first = 4 * self.nwindows
+        return [(4 * w0, 4 * w1),
+                (first + self.sample_bytes * w0 * self.windowln,
+                 first + self.sample_bytes * min(w1 * self.windowln, self.nsamples))]
+
+    def decode_columns(self, raw, samples):
+        """Decode a sample slice from the byte ranges given by sample_columns.
+
+        Args:
+            raw: (ntraces, width) uint8 array of the byte ranges side by side
+            samples: Contiguous slice of samples
+        Returns:
+            np.ndarray: (ntraces, len(slice)) float32 array
+        """
+        start, stop, w0, w1 = self._sample_range(samples)
+        nsamples = min(w1 * self.windowln, self.nsamples) - w0 * self.windowln
+        scalar_bytes = 4 * (w1 - w0)
+        decoded = self._decode_windows(raw[:, :scalar_bytes], raw[:, scalar_bytes:], nsamples)
+        offset = w0 * self.windowln
+        return decoded[:, start - offset:stop - offset]
+
+    def _decode_windows(self, scalar_bytes, sample_bytes, nsamples):
+        """Decode consecutive windows from their raw scalars and sample words"""
+        ntraces = scalar_bytes.shape[0]
+        scalars = np.ascontiguousarray(scalar_bytes).view(self.scalar_dtype)
+        samples = np.ascontiguousarray(sample_bytes).view(self.sample_dtype)
+        nwindows = scalars.shape[1]
+
+        # Reciprocal in double precision, as the adapter does with Python floats
+        scalars = scalars.astype(np.float64)
+        positive = scalars > 0.0
+        np.divide(1.0, scalars, out=scalars, where=positive)
+        scalars = scalars.astype(np.float32)
+
+        nfull = nwindows * self.windowln
+        padded = np.zeros((ntraces, nfull), dtype=np.float32)
+        padded[:, :nsamples] = samples[:, :nsamples].astype(np.int32) - self.sample_offset
+        windows = padded.reshape(ntraces, nwindows, self.windowln)
+        windows *= scalars[:, :, np.newaxis]
+        return padded[:, :nsamples]
+
+    def encode(self, traces):
+        """Encode float32 traces to compressed bytes.
+
+        Args:
+            traces: (ntraces, nsamples) array of trace samples
+        Returns:
+            np.ndarray: (ntraces, trclen) uint8 array ready to be written
+        """
+        traces = np.asarray(traces, dtype=np.float32)
+        if traces.ndim == 1:
+            traces = traces[np.newaxis, :]
+        ntraces = traces.shape[0]
+
+        nfull = self.nwindows * self.windowln
+        padded = np.zeros((ntraces, nfull), dtype=np.float32)
+        padded[:, :self.nsamples] = traces
+        windows = padded.reshape(ntraces, self.nwindows, self.windowln)
+
+        maxval = np.max(np.abs(windows), axis=-1)
+        live = maxval > 0
+        scalars = np.zeros((ntraces, self.nwindows), dtype=np.float32)
+        np.divide(np.float32(self.sample_scale), maxval, out=scalars, where=live)
+
+        scaled = windows * scalars[:, :, np.newaxis]
+        scaled += np.float32(self.sample_offset)
+        encoded = scaled.clip(0, 2 * self.sample_offset + 1).astype(self.sample_code)
+        encoded[~live] = self.sample_offset
+
+        out = np.empty((ntraces, self.trclen), dtype=np.uint8)
+        scalar_bytes = 4 * self.nwindows
+        out[:, :scalar_bytes] = scalars.astype(self.scalar_dtype).view(np.uint8)
+        samples = out[:, scalar_bytes:].view(self.sample_dtype)
+        samples[:, :self.nsamples] = encoded.reshape(ntraces, nfull)[:, :self.nsamples]
+        # Padding samples are written as zero
+        samples[:, self.nsamples:] = self.sample_offset
+        return out
+
+class CompressedInt16Codec(WindowedCodec):
+    """Batch codec for JavaSeis COMPRESSED_INT16 traces.
+
+    Samples are 16-bit words padded to an even count. Results are
+    bit-identical to CompressedInt16Adapter.
+    """
+    sample_code = 'u2'
+    sample_scale = 32766.0
+    sample_offset = 32767
+    sample_padding = 2
+
+class CompressedInt08Codec(WindowedCodec):
+    """Batch codec for JavaSeis COMPRESSED_INT08 traces.
+
+    Samples are 8-bit words padded to a multiple of four, so records take
+    about half the space of COMPRESSED_INT16.
+    """
+    sample_code = 'u1'
+    sample_scale = 126.0
+    sample_offset = 127
+    sample_padding = 4
+
+class FloatCodec:
+    """Codec for uncompressed JavaSeis FLOAT traces.
+
+    Records are plain float32 samples in the dataset ByteOrder, so decoding
+    is a zero-copy view of the raw bytes (of a memory map in mmap mode).
+    """
+    def __init__(self, nsamples, byte_order='little'):
+        self.nsamples = nsamples
+        self.byte_order = '<' if byte_order == 'little' else '>'
+        self.sample_dtype = np.dtype(self.byte_order + 'f4')
+        self.trclen = 4 * nsamples
+
+    def decode(self, buffer, ntraces=None):
+        """View raw traces as float32 without copying.
+
+        Args:
+            buffer: Bytes-like object or uint8 array of shape (ntraces, trclen)
+            ntraces: Number of traces (inferred from the buffer if None)
+        Returns:
+            np.ndarray: (ntraces, nsamples) array in the dataset byte order
+        """
+        raw = np.frombuffer(buffer, dtype=np.uint8) if not isinstance(buffer, np.ndarray) else buffer
+        if ntraces is None:
+            ntraces = raw.size // self.trclen
+        raw = np.ascontiguousarray(raw.reshape(ntraces, self.trclen))
+        return raw.view(self.sample_dtype)
+
+    def sample_columns(self, samples):
+        """Byte range of each trace record holding a sample slice"""
+        start, stop, step = samples.indices(self.nsamples)
+        if step != 1 or stop <= start:
+            raise ValueError(f"Sample slice must be a non-empty contiguous range, got {samples}")
+        return [(4 * start, 4 * stop)]
+
+    def decode_columns(self, raw, samples):
+        """View the byte range given by sample_columns as float32"""
+        return np.ascontiguousarray(raw).view(self.sample_dtype)
+
+    def encode(self, traces):
+        """Convert float32 traces to raw bytes.
+
+        Args:
+            traces: (ntraces, nsamples) array of trace samples
+        Returns:
+            np.ndarray: (ntraces, trclen) uint8 array ready to be written
+        """
+        traces = np.asarray(traces, dtype=self.sample_dtype)
+        if traces.ndim == 1:
+            traces = traces[np.newaxis, :]
+        return np.ascontiguousarray(traces).view(np.uint8)
+
+class TraceCodecAdapter(Adapter):
+    """Construct adapter decoding single trace records with a batch codec."""
+    def __init__(self, codec):
+        self.codec = codec
+        super().__init__(Bytes(codec.trclen))
+
+    def _decode(self, obj, context, path):
+        return self.codec.decode(obj, 1)[0]
+
+    def _encode(self, obj, context, path):
+        return self.codec.encode(obj).tobytes()
+
+# Map JavaSeis TraceFormat values to batch codecs
+TRACE_CODECS = {
+    'COMPRESSED_INT16': CompressedInt16Codec,
+    'COMPRESSED_INT08': CompressedInt08Codec,
+    'FLOAT': FloatCodec
+}
+
+def _trace_properties(file_props_tree):
+    """Get (nsamples, byte_order, trace_format) from FileProperties"""
     from pyseis.io.javaseis.xml_io import JavaSeisXML
-    
     logger.debug("Getting AxisLengths from FileProperties")
     axis_lengths_str = JavaSeisXML.get(file_props_tree, "AxisLengths")
     logger.debug(f"Raw AxisLengths: {axis_lengths_str}")
@@ -102,8 +334,24 @@ def build_trace_struct(file_props_tree) -> Struct:
     byte_order = JavaSeisXML.get(file_props_tree, "ByteOrder")
     logger.debug(f"ByteOrder: {byte_order}")
     byte_order = 'little' if byte_order == 'LITTLE_ENDIAN' else 'big'
+
+    trace_format = JavaSeisXML.get(file_props_tree, "TraceFormat", "COMPRESSED_INT16")
+    if trace_format not in TRACE_CODECS:
+        raise ValueError(f"Unsupported TraceFormat: {trace_format}")
     
-    return CompressedInt16Adapter(nsamples, byte_order)
+    return nsamples, byte_order, trace_format
+
+def build_trace_struct(file_props_tree) -> Adapter:
+    """Build trace struct for the dataset TraceFormat"""
+    nsamples, byte_order, trace_format = _trace_properties(file_props_tree)
+    if trace_format == 'COMPRESSED_INT16':
+        return CompressedInt16Adapter(nsamples, byte_order)
+    return TraceCodecAdapter(TRACE_CODECS[trace_format](nsamples, byte_order))
+
+def build_trace_codec(file_props_tree):
+    """Build batch trace codec for the dataset TraceFormat"""
+    nsamples, byte_order, trace_format = _trace_properties(file_props_tree)
+    return TRACE_CODECS[trace_format](nsamples, byte_order)
 
 # Map JavaSeis types to construct types
 TYPE_MAP = {
@@ -115,6 +363,7 @@ TYPE_MAP = {
 
 def build_header_struct(file_properties_tree):
     """Build header struct from TraceProperties in FileProperties.xml"""
+    from pyseis.io.javaseis.xml_io import JavaSeisXML
     logger.debug("Building header struct from TraceProperties")
     
     # Get TraceProperties section
@@ -159,5 +408,61 @@ def build_header_struct(file_properties_tree):
     
     return Struct(**struct_def)
 
+# Map JavaSeis types to numpy types
+DTYPE_MAP = {
+    'BYTE': 'i1',
+    'SHORT': 'i2',
+    'INTEGER': 'i4',
+    'FLOAT': 'f4',
+    'DOUBLE': 'f8',
+    'LONG': 'i8'
+}
+
+def build_header_dtype(file_properties_tree) -> np.dtype:
+    """Compile TraceProperties in FileProperties.xml into a numpy structured dtype.
+
+    Each field is placed at its byteOffset with its elementCount, in the
+    dataset ByteOrder. The record size is HeaderLengthBytes, so any gap after
+    the last field becomes padding and raw header extents can be viewed
+    directly with np.frombuffer or np.memmap.
+    """
+    from pyseis.io.javaseis.xml_io import JavaSeisXML
+    logger.debug("Compiling header dtype from TraceProperties")
+
+    trace_props = file_properties_tree.find(".//parset[@name='TraceProperties']")
+    if trace_props is None:
+        raise ValueError("No TraceProperties section found in FileProperties.xml")
+
+    byte_order = '>' if JavaSeisXML.get(file_properties_tree, "ByteOrder") == "BIG_ENDIAN" else '<'
+
+    names, formats, offsets = [], [], []
+    end = 0
+    for entry in trace_props.findall("parset"):
+        label = JavaSeisXML.get(entry, "label")
+        fmt = JavaSeisXML.get(entry, "format")
+        count = int(JavaSeisXML.get(entry, "elementCount"))
+        offset = int(JavaSeisXML.get(entry, "byteOffset"))
+
+        if fmt not in DTYPE_MAP:
+            raise ValueError(f"Unknown format: {fmt}")
+
+        field = np.dtype(byte_order + DTYPE_MAP[fmt])
+        if count > 1:
+            field = np.dtype((field, (count,)))
+
+        logger.debug(f"Header field: {label} ({fmt}) at offset {offset}")
+        names.append(label)
+        formats.append(field)
+        offsets.append(offset)
+        end = max(end, offset + field.itemsize)
 
+    header_length = int(JavaSeisXML.get(file_properties_tree, "HeaderLengthBytes", "0"))
+    if header_length and header_length < end:
+        raise ValueError(f"HeaderLengthBytes ({header_length}) is shorter than the trace properties ({end})")
 
+    return np.dtype({
+        'names': names,
+        'formats': formats,
+        'offsets': offsets,
+        'itemsize': max(header_length, end)
+    })
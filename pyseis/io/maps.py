@@ -173,6 +173,23 @@ RSF_TO_SEISDATA = {
     "elscal": "elevation_scalar"
 }
 
+# SEG-Y trace header fields (segy_format.yaml names) to JavaSeis header labels
+SEGY_TO_JAVASEIS = {
+    "fldr": "FFID",
+    "tracf": "CHAN",
+    "ep": "SOURCE",
+    "cdp": "CDP",
+    "offset": "OFFSET",
+    "sx": "SOU_X",
+    "sy": "SOU_Y",
+    "gx": "REC_X",
+    "gy": "REC_Y",
+    "selev": "SOU_ELEV",
+    "gelev": "REC_ELEV",
+    "scalco": "COORD_SCALAR",
+    "scalel": "ELEV_SCALAR"
+}
+
 def get_format_map(format_name: str) -> dict:
     """
     Get the mapping dictionary for converting from a specific format to SeisData.
@@ -1,10 +1,43 @@
 import sys
 import os
+import mmap
+import logging
+from concurrent.futures import ThreadPoolExecutor
 # Add the project root to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
+import numpy as np
+import yaml
 from construct import *
-from pyseis.io.tools import ibm2ieee, ieee2ibm  # Now use absolute import
+from pyseis.io import utils
+from pyseis.io.utils import ibm2ieee, ieee2ibm, pack_records  # Now use absolute import
+
+logger = logging.getLogger(__name__)
+
+# Field layout of the textual, binary and trace headers
+FORMAT_FILE = os.path.join(os.path.dirname(__file__), "segy_format.yaml")
+
+# Map segy_format.yaml field types to numpy types
+DTYPE_MAP = {
+    'int16': 'i2',
+    'uint16': 'u2',
+    'int32': 'i4',
+    'uint32': 'u4',
+}
+
+# Trace headers copied per step of a header scan
+SCAN_CHUNK_TRACES = 65536
+
+# Map data sample format codes to numpy types as stored on disk
+SAMPLE_FORMATS = {
+    1: 'u4',  # IBM Float32, decoded with ibm2ieee
+    2: 'i4',  # Int32
+    3: 'i2',  # Int16
+    5: 'f4',  # IEEE Float32
+    6: 'f8',  # IEEE Float64
+    8: 'i1',  # Int8
+    16: 'u1',  # UInt8
+}
 
 class IBMFloatAdapter(Adapter):
     def _decode(self, obj, context, path):
@@ -117,6 +150,510 @@ segy_format = Struct(
         )
     )
 )
+def _save_sidecar(path, array):
+    """Save a sidecar cache file, carrying on without it if the directory is read-only"""
+    try:
+        np.save(path, array)
+    except OSError as error:
+        logger.warning("Could not write sidecar file %s: %s", path, error)
+
+def load_segy_format(format_file=FORMAT_FILE):
+    """Load the SEG-Y header definitions from segy_format.yaml"""
+    with open(format_file, 'r') as f:
+        return yaml.safe_load(f)
+
+def build_header_dtype(fields, itemsize, byte_order='>'):
+    """Compile a header section of segy_format.yaml into a numpy structured dtype.
+
+    Args:
+        fields: Mapping of field name to {type, offset[, size]}
+        itemsize: Size of the header in bytes
+        byte_order: '>' for big-endian, '<' for little-endian
+    Returns:
+        np.dtype: Structured dtype with every field at its byte offset
+    """
+    def field_format(name, spec):
+        if spec['type'] == 'bytes':
+            return np.dtype(f"V{spec['size']}"), spec['offset']
+        if spec['type'] in DTYPE_MAP:
+            return np.dtype(byte_order + DTYPE_MAP[spec['type']]), spec['offset']
+        raise ValueError(f"Unknown type {spec['type']} for header field {name}")
+    return utils.build_header_dtype(fields, itemsize, field_format)
+
+def build_trace_dtype(header_dtype, nsamples, format_code, byte_order='>'):
+    """Numpy dtype of a whole trace record: the trace header followed by the samples"""
+    if format_code not in SAMPLE_FORMATS:
+        raise ValueError(f"Unsupported data sample format code: {format_code}")
+    sample_dtype = np.dtype(byte_order + SAMPLE_FORMATS[format_code])
+    return np.dtype([('header', header_dtype), ('samples', sample_dtype, (nsamples,))])
+
+class SegyReader:
+    """Memory-mapped reader for SEG-Y files.
+
+    The textual and binary headers are read once and the trace section that
+    follows them (and any extended textual headers) is memory-mapped, so
+    files of any size open instantly and only the pages that are used are
+    read. Fixed-length files are mapped as an array of trace records and
+    header and sample access returns array views of the map.
+
+    Samples of every format in SAMPLE_FORMATS are viewed with the matching
+    numpy dtype. The byte order is detected from the binary header (or
+    given as byte_order), and little-endian files are mapped with
+    little-endian dtypes rather than byte swapped.
+
+    Files whose traces vary in length are detected (or forced with
+    variable_length=True) and indexed in one pass over the trace headers,
+    recording the byte offset and sample count of every trace. The index is
+    cached next to the file, and reads then seek straight to each trace.
+    """
+    def __init__(self, path, format_file=FORMAT_FILE, variable_length=None, cache=True, byte_order=None):
+        self.path = path
+        self.format = load_segy_format(format_file)
+        details = self.format['format_details']
+
+        text_size = self.format['ebcdic_header']['size']
+        with open(path, 'rb') as f:
+            self.textual_header = f.read(text_size).decode(self.format['ebcdic_header']['encoding'])
+            binary = f.read(400)
+
+        default_order = '>' if details['endian'] == 'big' else '<'
+        self.byte_order = byte_order or self._detect_byte_order(binary, default_order)
+        self.binary_dtype = build_header_dtype(self.format['binary_header'], 400, self.byte_order)
+        self.header_dtype = build_header_dtype(self.format['trace_header'],
+                                               details['trace_header_size'], self.byte_order)
+        self.binary_header = np.frombuffer(binary, dtype=self.binary_dtype)[0]
+
+        self.nsamples = int(self.binary_header['hns'])
+        self.sample_interval = int(self.binary_header['hdt'])
+        self.format_code = int(self.binary_header['format'])
+        extended_headers = self._extended_header_count() if self.binary_header['segyrev'] else 0
+        self.data_offset = text_size + self.binary_dtype.itemsize + text_size * extended_headers
+
+        self.trace_dtype = build_trace_dtype(self.header_dtype, self.nsamples, self.format_code, self.byte_order)
+        self.sample_dtype = self.trace_dtype.fields['samples'][0].base
+        self.file_size = os.path.getsize(path)
+
+        if variable_length is None:
+            variable_length = not self._is_fixed_length()
+        self.variable_length = variable_length
+
+        if variable_length:
+            self.data = None
+            self.raw = np.memmap(path, dtype=np.uint8, mode='r')
+            self.offsets = self.build_offset_index(cache)
+            self.ntraces = len(self.offsets)
+        else:
+            self.raw = None
+            self.ntraces = (self.file_size - self.data_offset) // self.trace_dtype.itemsize
+            self.data = np.memmap(path, dtype=self.trace_dtype, mode='r', offset=self.data_offset,
+                                  shape=(self.ntraces,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.ntraces
+
+    def close(self):
+        """Drop the memory maps"""
+        self.data = None
+        self.raw = None
+
+    def _detect_byte_order(self, binary, default_order):
+        """Pick the byte order giving a known sample format code and a sample count"""
+        for order in (default_order, '<' if default_order == '>' else '>'):
+            header = np.frombuffer(binary, dtype=build_header_dtype(self.format['binary_header'], 400, order))[0]
+            if int(header['format']) in SAMPLE_FORMATS and int(header['hns']) > 0:
+                return order
+        return default_order
+
+    def _extended_header_count(self):
+        """Number of extended textual headers after the binary header.
+
+        A count of -1 means a variable number, ending with the header that
+        holds the ((SEG: EndText)) stanza, so the headers are scanned for it.
+        """
+        count = int(self.binary_header['numhdr'])
+        if count >= 0:
+            return count
+        if count != -1:
+            raise ValueError(f"Invalid extended textual header count {count}")
+
+        text_size = self.format['ebcdic_header']['size']
+        encodings = (self.format['ebcdic_header']['encoding'], 'ascii')
+        nheaders = 0
+        with open(self.path, 'rb') as f:
+            f.seek(text_size + 400)
+            while True:
+                block = f.read(text_size)
+                if len(block) < text_size:
+                    raise ValueError("Extended textual headers have no ((SEG: EndText)) stanza")
+                nheaders += 1
+                if any('EndText' in block.decode(encoding, errors='ignore') for encoding in encodings):
+                    return nheaders
+
+    def _trace_nsamples(self, f, offset):
+        """Sample count from the trace header at a byte offset, 0 if unset"""
+        ns_offset = self.header_dtype.fields['ns'][1]
+        f.seek(offset + ns_offset)
+        return int(np.frombuffer(f.read(2), dtype=self.byte_order + 'u2')[0])
+
+    def _is_fixed_length(self):
+        """Whether every trace has the binary header sample count.
+
+        Trusts the fixed length trace flag of revision 1 files. Otherwise the
+        trace section must be a whole number of records and the sample count
+        of every trace header, read at the record stride, must be unset or
+        match. The first trace of another length always has its header at
+        the stride position, so it cannot be missed.
+        """
+        if self.binary_header['segyrev'] and self.binary_header['fixedlen']:
+            return True
+        record_size = self.trace_dtype.itemsize
+        section = self.file_size - self.data_offset
+        if section % record_size:
+            return False
+        if section == 0:
+            return True
+        headers = self._strided_headers(['ns'], section // record_size)
+        for first in range(0, len(headers), SCAN_CHUNK_TRACES):
+            ns = headers['ns'][first:first + SCAN_CHUNK_TRACES]
+            if np.any((ns != 0) & (ns != self.nsamples)):
+                return False
+        return True
+
+    def _strided_headers(self, fields, ntraces):
+        """Map header fields of fixed-length traces at the trace stride, skipping the samples.
+
+        The map is advised for random access, so only the pages holding
+        trace headers are read.
+        """
+        strided = np.dtype({'names': fields,
+                            'formats': [self.header_dtype.fields[name][0] for name in fields],
+                            'offsets': [self.header_dtype.fields[name][1] for name in fields],
+                            'itemsize': self.trace_dtype.itemsize})
+        headers = np.memmap(self.path, dtype=strided, mode='r', offset=self.data_offset, shape=(ntraces,))
+        if hasattr(mmap, 'MADV_RANDOM'):
+            headers._mmap.madvise(mmap.MADV_RANDOM)
+        return headers
+
+    def offset_index_path(self):
+        """Path of the sidecar file caching the trace offset index"""
+        return self.path + ".offsets.npy"
+
+    def build_offset_index(self, cache=True):
+        """Index the byte offset and sample count of every trace.
+
+        Walks the trace headers once, reading only the sample count of each
+        one to find the next. Traces with no sample count in their header
+        use the binary header value.
+
+        Args:
+            cache: Load and save the index in a sidecar file, reused while it
+                is newer than the SEG-Y file
+        Returns:
+            np.ndarray: Structured array of 'byte_offset' and 'ns' per trace
+        """
+        index_path = self.offset_index_path()
+        if cache and os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(self.path):
+            return np.load(index_path)
+
+        header_size = self.header_dtype.itemsize
+        sample_size = self.sample_dtype.itemsize
+        offsets, counts = [], []
+        offset = self.data_offset
+        with open(self.path, 'rb') as f:
+            while offset + header_size <= self.file_size:
+                ns = self._trace_nsamples(f, offset) or self.nsamples
+                if offset + header_size + ns * sample_size > self.file_size:
+                    raise ValueError(f"Trace {len(offsets)} at byte {offset} runs past the end of the file")
+                offsets.append(offset)
+                counts.append(ns)
+                offset += header_size + ns * sample_size
+
+        index = np.empty(len(offsets), dtype=[('byte_offset', np.int64), ('ns', np.int32)])
+        index['byte_offset'] = offsets
+        index['ns'] = counts
+        if cache:
+            _save_sidecar(index_path, index)
+        return index
+
+    def _gather(self, offsets, size):
+        """Copy size bytes starting at each byte offset into a (n, size) array.
+
+        The offsets are split into runs with a constant stride (traces of
+        equal length), and each run is copied from one strided view of the
+        map, so memory use is the size of the result.
+        """
+        offsets = np.asarray(offsets, dtype=np.int64)
+        data = np.empty((len(offsets), size), dtype=np.uint8)
+        steps = np.diff(offsets)
+        # Step indices where the stride changes
+        changes = np.flatnonzero(steps[1:] != steps[:-1]) + 1
+        first = 0
+        while first < len(offsets):
+            if first + 1 == len(offsets):
+                last, stride = first, size
+            else:
+                next_change = np.searchsorted(changes, first, side='right')
+                last = int(changes[next_change]) if next_change < len(changes) else len(steps)
+                stride = int(steps[first])
+            run = np.lib.stride_tricks.as_strided(self.raw[offsets[first]:], shape=(last - first + 1, size),
+                                                  strides=(stride, 1), writeable=False)
+            data[first:last + 1] = run
+            first = last + 1
+        return data
+
+    @property
+    def headers(self):
+        """Trace headers of every trace as a structured array view (fixed-length files only)"""
+        if self.variable_length:
+            raise ValueError("Traces vary in length, use get_headers or scan_headers")
+        return self.data['header']
+
+    @property
+    def samples(self):
+        """Raw samples of every trace as stored on disk, as an array view"""
+        if self.variable_length:
+            raise ValueError("Traces vary in length, use get_trace or get_traces")
+        return self.data['samples']
+
+    def _decode(self, samples):
+        """Convert raw samples to float32"""
+        samples = np.asarray(samples)
+        if self.format_code == 1:
+            return ibm2ieee(samples)
+        return samples.astype(np.float32)
+
+    def get_headers(self, start, count):
+        """Get a range of trace headers as a structured array (a view for fixed-length files)"""
+        if not self.variable_length:
+            return self.headers[start:start + count]
+        offsets = self.offsets['byte_offset'][start:start + count]
+        return self._gather(offsets, self.header_dtype.itemsize).view(self.header_dtype)[:, 0]
+
+    def get_trace(self, index):
+        """Get one trace as a float32 array of its own length"""
+        if not self.variable_length:
+            return self._decode(self.samples[index])
+        offset, ns = self.offsets[index]
+        begin = int(offset) + self.header_dtype.itemsize
+        return self._decode(self.raw[begin:begin + int(ns) * self.sample_dtype.itemsize].view(self.sample_dtype))
+
+    def get_traces(self, start, count):
+        """Get a range of traces as a (count, nsamples) float32 array.
+
+        For variable-length files the array is as wide as the longest trace
+        in the range and shorter traces are padded with zeros.
+        """
+        if not self.variable_length:
+            return self._decode(self.samples[start:start + count])
+        index = self.offsets[start:start + count]
+        traces = np.zeros((len(index), index['ns'].max() if len(index) else 0), dtype=np.float32)
+        for i, ns in enumerate(index['ns']):
+            traces[i, :ns] = self.get_trace(start + i)
+        return traces
+
+    def index_path(self):
+        """Path of the sidecar file caching header scans"""
+        return self.path + ".headers.npy"
+
+    def scan_headers(self, fields=None, cache=True):
+        """Read selected trace header fields without touching the samples.
+
+        The headers are read through a separate memory map advised for
+        random access, viewed at the trace stride (or gathered at the
+        indexed offsets of a variable-length file), so only the pages
+        holding trace headers are read rather than the whole file. The
+        result can be cached in a sidecar file next to the SEG-Y file and is
+        reused while it is newer than the file and holds the requested
+        fields.
+
+        Args:
+            fields: Header field names to read (default all)
+            cache: Load and save the sidecar index
+        Returns:
+            np.ndarray: Structured array of the fields plus 'byte_offset',
+            the file offset of each trace
+        """
+        fields = list(self.header_dtype.names if fields is None else fields)
+        unknown = [name for name in fields if name not in self.header_dtype.names]
+        if unknown:
+            raise ValueError(f"Unknown trace header fields: {unknown}")
+
+        index_path = self.index_path()
+        if cache and os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(self.path):
+            index = np.load(index_path)
+            if len(index) == self.ntraces and all(name in index.dtype.names for name in fields):
+                return index[fields + ['byte_offset']]
+
+        index_dtype = np.dtype([(name, self.header_dtype.fields[name][0].newbyteorder('='))
+                                for name in fields] + [('byte_offset', np.int64)])
+        index = np.empty(self.ntraces, dtype=index_dtype)
+
+        if self.variable_length:
+            index['byte_offset'] = self.offsets['byte_offset']
+            for first in range(0, self.ntraces, SCAN_CHUNK_TRACES):
+                chunk = self.get_headers(first, SCAN_CHUNK_TRACES)
+                for name in fields:
+                    index[name][first:first + len(chunk)] = chunk[name]
+        elif self.ntraces:
+            index['byte_offset'] = self.data_offset + np.arange(self.ntraces, dtype=np.int64) * self.trace_dtype.itemsize
+            headers = self._strided_headers(fields, self.ntraces)
+            for first in range(0, self.ntraces, SCAN_CHUNK_TRACES):
+                chunk = headers[first:first + SCAN_CHUNK_TRACES]
+                for name in fields:
+                    index[name][first:first + len(chunk)] = chunk[name]
+            del headers
+
+        if cache:
+            _save_sidecar(index_path, index)
+        return index
+
+    def _read_positions(self, positions):
+        """Read traces and headers at arbitrary trace numbers, in the order given.
+
+        The positions are sorted and adjacent traces are read as one range,
+        then the rows are put back in the requested order.
+        """
+        ordered = np.sort(positions)
+        breaks = np.flatnonzero(np.diff(ordered) != 1) + 1
+        runs = [(int(run[0]), run.size) for run in np.split(ordered, breaks) if run.size]
+        headers = np.concatenate([self.get_headers(start, count) for start, count in runs])
+        rows = np.searchsorted(ordered, positions)
+        if self.variable_length:
+            # Traces of different lengths are returned as a list
+            return headers[rows], [self.get_trace(int(i)) for i in positions]
+        traces = np.concatenate([self.get_traces(start, count) for start, count in runs])
+        return headers[rows], traces[rows]
+
+    def iter_gathers(self, primary, secondary=None, prefetch=True, cache=True):
+        """Iterate over gathers sorted by header keys, without loading the file.
+
+        A header index of the sort keys is built once by scan_headers (and
+        cached as its sidecar file). Traces are sorted by primary and then
+        secondary key, and each gather of equal primary key is read with
+        one read per run of adjacent traces. With prefetch, the next gather
+        is read on a background thread while the current one is processed.
+
+        Args:
+            primary: Header field defining gathers, e.g. 'cdp'
+            secondary: Header field sorting traces within a gather, e.g. 'offset'
+            prefetch: Read the next gather in the background
+            cache: Load and save the header index sidecar file
+        Yields:
+            tuple: (primary key value, headers, traces) of each gather
+        """
+        fields = [primary] if secondary is None or secondary == primary else [primary, secondary]
+        index = self.scan_headers(fields, cache)
+        keys = (index[primary],) if secondary is None else (index[secondary], index[primary])
+        order = np.lexsort(keys)
+        sorted_keys = index[primary][order]
+        bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+        gathers = np.split(order, bounds) if order.size else []
+
+        if not prefetch:
+            for positions in gathers:
+                headers, traces = self._read_positions(positions)
+                yield index[primary][positions[0]], headers, traces
+            return
+
+        with ThreadPoolExecutor(1) as executor:
+            pending = executor.submit(self._read_positions, gathers[0]) if gathers else None
+            for i, positions in enumerate(gathers):
+                headers, traces = pending.result()
+                if i + 1 < len(gathers):
+                    pending = executor.submit(self._read_positions, gathers[i + 1])
+                yield index[primary][positions[0]], headers, traces
+
+class SegyWriter:
+    """Streaming writer for fixed-length SEG-Y files.
+
+    The textual and binary headers are written when the writer is opened,
+    then traces are appended in chunks. Each chunk is encoded into one
+    buffer of interleaved trace headers and samples and written with a
+    single sequential write, so memory use is bounded by the chunk size
+    however large the file grows.
+    """
+    def __init__(self, path, nsamples, sample_interval, format_code=1, textual_header="",
+                 binary_header=None, format_file=FORMAT_FILE):
+        """
+        Args:
+            path: Output SEG-Y file
+            nsamples: Samples per trace
+            sample_interval: Sample interval in microseconds
+            format_code: Data sample format code, one of SAMPLE_FORMATS
+            textual_header: Text of the 3200-byte textual header
+            binary_header: Extra binary header values by field name
+            format_file: SEG-Y header definitions
+        """
+        self.path = path
+        self.format = load_segy_format(format_file)
+        details = self.format['format_details']
+        self.byte_order = '>' if details['endian'] == 'big' else '<'
+        self.binary_dtype = build_header_dtype(self.format['binary_header'], 400, self.byte_order)
+        self.header_dtype = build_header_dtype(self.format['trace_header'],
+                                               details['trace_header_size'], self.byte_order)
+        self.nsamples = nsamples
+        self.sample_interval = sample_interval
+        self.format_code = format_code
+        self.trace_dtype = build_trace_dtype(self.header_dtype, nsamples, format_code, self.byte_order)
+        self.ntraces = 0
+
+        binary = np.zeros(1, dtype=self.binary_dtype)
+        binary['hns'] = nsamples
+        binary['hdt'] = sample_interval
+        binary['format'] = format_code
+        binary['segyrev'] = 0x0100
+        binary['fixedlen'] = 1
+        for name, value in (binary_header or {}).items():
+            binary[name] = value
+
+        text_size = self.format['ebcdic_header']['size']
+        text = textual_header.ljust(text_size)[:text_size].encode(self.format['ebcdic_header']['encoding'])
+        self.file = open(path, 'wb')
+        self.file.write(text)
+        self.file.write(binary.tobytes())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Flush and close the output file"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def write(self, headers, samples):
+        """Append a chunk of traces.
+
+        Args:
+            headers: Structured array of trace headers, packed with
+                pack_records. The sample count and interval are always set
+                from the writer.
+            samples: (ntraces, nsamples) array of trace samples
+        """
+        samples = np.asarray(samples)
+        sample_dtype = self.trace_dtype.fields['samples'][0].base
+        if self.format_code == 1:
+            samples = ieee2ibm(samples, byte_order=self.byte_order)
+        elif sample_dtype.kind in 'iu':
+            info = np.iinfo(sample_dtype)
+            samples = np.clip(np.rint(samples), info.min, info.max)
+
+        records = pack_records(self.trace_dtype, headers, samples)
+        records['header']['ns'] = self.nsamples
+        records['header']['dt'] = self.sample_interval
+
+        self.file.write(memoryview(records.view(np.uint8)))
+        self.ntraces += len(records)
+
 if __name__ == "__main__":
     segy_data = open('../../data/Line_001.sgy', 'rb').read()
     parsed_data = segy_format.parse(segy_data)
@@ -1,31 +1,303 @@
 # Standard library imports
-from dataclasses import dataclass, field
-from pprint import pprint
 import os
+import sys
 
 # Third-party library imports
 import numpy as np
-from typing import List, Dict, Any
+import yaml
 
 # Local application/library specific imports
-from .models import SeisFile, create_block_dataclass
+from pyseis.io import utils
+from pyseis.io.utils import pack_records
 
-class SU(SeisFile):
+FORMAT_FILE = os.path.join(os.path.dirname(__file__), "su.yaml")
+
+# Size of an SU trace header in bytes
+HEADER_SIZE = 240
+
+# Traces read per chunk from a stream
+CHUNK_TRACES = 4096
+
+# su.yaml field formats to numpy kinds
+FORMAT_KINDS = {
+    'int': 'i',
+    'uint': 'u',
+    'float': 'f',
+}
+
+def load_su_format(format_file=FORMAT_FILE):
+    """Load the SU trace header definition from su.yaml"""
+    with open(format_file, 'r') as f:
+        return yaml.safe_load(f)['SU_TRACE_HEADER']['definition']
+
+def build_header_dtype(fields, byte_order='<'):
+    """Compile the su.yaml trace header definition into a 240-byte structured dtype.
+
+    Args:
+        fields: Mapping of field name to {start_byte, num_bytes, format}
+        byte_order: '<' for little-endian, '>' for big-endian
     """
-    Base class for initializing SU files
+    def field_format(name, spec):
+        if spec['format'] == 'bytes':
+            return np.dtype(f"V{spec['num_bytes']}"), spec['start_byte']
+        if spec['format'] in FORMAT_KINDS:
+            return np.dtype(f"{byte_order}{FORMAT_KINDS[spec['format']]}{spec['num_bytes']}"), spec['start_byte']
+        raise ValueError(f"Unknown format {spec['format']} for header field {name}")
+    return utils.build_header_dtype(fields, HEADER_SIZE, field_format)
+
+def build_trace_dtype(header_dtype, nsamples, byte_order='<'):
+    """Record dtype of one SU trace: the 240-byte header then float32 samples"""
+    return np.dtype([('header', header_dtype), ('samples', byte_order + 'f4', (nsamples,))])
+
+def build_records(trace_dtype, headers, samples, sample_interval=None):
+    """Pack headers and samples into SU trace records with ns (and dt) set.
+
+    Args:
+        trace_dtype: SU trace record dtype
+        headers: Structured array of trace headers
+        samples: (ntraces, nsamples) array of trace samples
+        sample_interval: Sample interval in microseconds to set in every
+            header (default: keep the headers' dt)
+    Returns:
+        np.ndarray: Array of trace records
     """
+    records = pack_records(trace_dtype, headers, samples)
+    records['header']['ns'] = trace_dtype.fields['samples'][0].shape[0]
+    if sample_interval is not None:
+        records['header']['dt'] = sample_interval
+    return records
+
+def _read_full(stream, buffer):
+    """Read into buffer until it is full or the stream ends, returning the bytes read"""
+    total = 0
+    while total < len(buffer):
+        count = stream.readinto(buffer[total:])
+        if not count:
+            break
+        total += count
+    return total
+
+def read_stream(stream=None, chunk_traces=CHUNK_TRACES, byte_order='<', format_file=FORMAT_FILE):
+    """Read an SU stream in chunks of whole trace records.
 
-    def __init__(self, path=None):
-        super().__init__()
-        #this loads the header dictionaries
-        self.initialize()
+    The sample count is taken from the first trace header, then each chunk
+    of up to chunk_traces records is read straight into a new record array,
+    so memory use is bounded by the chunk size however long the stream is
+    and reads block with the upstream process.
+
+    Args:
+        stream: Binary stream to read (default stdin)
+        chunk_traces: Traces per chunk
+        byte_order: '<' for little-endian, '>' for big-endian streams
+        format_file: SU header definitions
+    Yields:
+        np.ndarray: Trace records with 'header' and 'samples' fields
+    """
+    stream = sys.stdin.buffer if stream is None else stream
+    header_dtype = build_header_dtype(load_su_format(format_file), byte_order)
+    first = bytearray(HEADER_SIZE)
+    count = _read_full(stream, memoryview(first))
+    if count == 0:
+        return
+    if count < HEADER_SIZE:
+        raise ValueError("SU stream ended part way through a trace header")
+    nsamples = int(np.frombuffer(first, dtype=header_dtype)[0]['ns'])
+    trace_dtype = build_trace_dtype(header_dtype, nsamples, byte_order)
+
+    pending = first
+    while True:
+        records = np.empty(chunk_traces, dtype=trace_dtype)
+        buffer = memoryview(records.view(np.uint8))
+        buffer[:len(pending)] = pending
+        nbytes = len(pending) + _read_full(stream, buffer[len(pending):])
+        pending = b''
+        ntraces, remainder = divmod(nbytes, trace_dtype.itemsize)
+        if remainder:
+            raise ValueError("SU stream ended part way through a trace")
+        records = records[:ntraces]
+        if np.any(records['header']['ns'] != nsamples):
+            raise ValueError(f"SU stream traces must all have {nsamples} samples")
+        if ntraces:
+            yield records
+        if ntraces < chunk_traces:
+            return
+
+def read_gathers(key, stream=None, chunk_traces=CHUNK_TRACES, byte_order='<', format_file=FORMAT_FILE):
+    """Read an SU stream one gather at a time.
+
+    A gather is a run of consecutive traces with the same value of a header
+    field, so the stream should already be sorted by it (e.g. by susort).
+    Only the gather being assembled and one chunk are held in memory.
+
+    Args:
+        key: Trace header field that identifies the gathers
+        stream: Binary stream to read (default stdin)
+        chunk_traces: Traces read per chunk
+        byte_order: '<' for little-endian, '>' for big-endian streams
+        format_file: SU header definitions
+    Yields:
+        np.ndarray: Trace records of each gather
+    """
+    pieces, current = [], None
+    for records in read_stream(stream, chunk_traces, byte_order, format_file):
+        keys = records['header'][key]
+        bounds = [0, *(np.flatnonzero(keys[1:] != keys[:-1]) + 1), len(records)]
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if pieces and keys[start] != current:
+                yield np.concatenate(pieces)
+                pieces = []
+            pieces.append(records[start:end])
+            current = keys[start]
+    if pieces:
+        yield np.concatenate(pieces)
+
+def write_stream(records, stream=None):
+    """Write trace records to an SU stream and flush them downstream straight away.
+
+    Args:
+        records: Trace records, as yielded by read_stream or built with
+            build_records
+        stream: Binary stream to write (default stdout)
+    """
+    stream = sys.stdout.buffer if stream is None else stream
+    stream.write(memoryview(np.ascontiguousarray(records).view(np.uint8)))
+    stream.flush()
+
+class SU:
+    """Memory-mapped reader and writer for Seismic Unix files.
+
+    An SU file has no file header: it is a run of 240-byte trace headers,
+    each followed by float32 samples, all of one length. The first trace
+    header gives the sample count, and the whole file is then mapped as one
+    record array whose 'header' and 'samples' fields are the headers and
+    traces, so 20-100 GB files are never read into memory.
+
+    Files opened with mode 'w' or 'a' grow by one sequential write per chunk
+    of traces. The map is rebuilt only when the file is next read.
+    """
+    def __init__(self, path=None, mode='r', nsamples=None, sample_interval=None, byte_order='<',
+                 format_file=FORMAT_FILE):
+        """
+        Args:
+            path: SU file to open
+            mode: 'r' to read, 'w' to create (or truncate) or 'a' to append
+            nsamples: Samples per trace of a new file. Taken from the first
+                trace header of an existing file, or from the first chunk
+                written if not given.
+            sample_interval: Sample interval in microseconds written to the
+                trace headers of new traces (default: as given in the headers)
+            byte_order: '<' for little-endian, '>' for big-endian files
+            format_file: SU header definitions
+        """
+        self.byte_order = byte_order
+        self.header_dtype = build_header_dtype(load_su_format(format_file), byte_order)
+        self.nsamples = nsamples
+        self.sample_interval = sample_interval
+        self.trace_dtype = None
+        self.ntraces = 0
+        self._data = None
+        self._mapped_traces = 0
+        self.file = None
         self.path = path
+        self.mode = mode
         if path:
-            open(self.path)
- 
+            self.open(path, mode)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.ntraces
+
+    def open(self, path, mode='r'):
+        """Open an SU file for reading, writing or appending"""
+        if mode not in ('r', 'w', 'a'):
+            raise ValueError(f"Invalid mode {mode}, expected 'r', 'w' or 'a'")
+        self.close()
+        self.path = path
+        self.mode = mode
+        if mode == 'w' or (mode == 'a' and not os.path.exists(path)):
+            open(path, 'wb').close()
+
+        size = os.path.getsize(path)
+        if size >= HEADER_SIZE:
+            with open(path, 'rb') as f:
+                first = np.frombuffer(f.read(HEADER_SIZE), dtype=self.header_dtype)[0]
+            self.nsamples = int(first['ns'])
+        elif mode == 'r':
+            raise ValueError(f"{path} does not contain an SU trace header")
+
+        if self.nsamples is not None:
+            self.trace_dtype = build_trace_dtype(self.header_dtype, self.nsamples, self.byte_order)
+            self.ntraces = size // self.trace_dtype.itemsize
+        if mode != 'r':
+            self.file = open(path, 'ab')
+
+    def close(self):
+        """Drop the memory map and close the output file"""
+        self._data = None
+        self._mapped_traces = 0
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    @property
+    def data(self):
+        """Every trace record of the file as a read-only memory map, None if empty.
+
+        The map is rebuilt on first use after traces have been appended.
+        """
+        if self._mapped_traces != self.ntraces:
+            self._data = np.memmap(self.path, dtype=self.trace_dtype, mode='r', shape=(self.ntraces,))
+            self._mapped_traces = self.ntraces
+        return self._data
+
+    @property
+    def headers(self):
+        """Trace headers of the whole file as a view of the map"""
+        if self.data is None:
+            return np.zeros(0, dtype=self.header_dtype)
+        return self.data['header']
+
+    @property
+    def traces(self):
+        """(ntraces, nsamples) samples of the whole file as a view of the map"""
+        if self.data is None:
+            return np.zeros((0, self.nsamples or 0), dtype=self.byte_order + 'f4')
+        return self.data['samples']
+
+    def get_headers(self, start, count):
+        """Get a range of trace headers as a structured array view"""
+        return self.headers[start:start + count]
+
+    def get_traces(self, start, count):
+        """Get a range of trace samples as a (count, nsamples) array view"""
+        return self.traces[start:start + count]
+
+    def write(self, headers, samples):
+        """Append a chunk of traces.
+
+        Args:
+            headers: Structured array of trace headers, packed with
+                build_records. ns is always the file's sample count.
+            samples: (ntraces, nsamples) array of trace samples
+        """
+        if self.file is None:
+            raise ValueError("SU file is not open for writing")
+        samples = np.asarray(samples)
+        if samples.ndim != 2:
+            raise ValueError(f"Expected samples of shape (ntraces, nsamples), got {samples.shape}")
+        if self.trace_dtype is None:
+            self.nsamples = samples.shape[1]
+            self.trace_dtype = build_trace_dtype(self.header_dtype, self.nsamples, self.byte_order)
+        records = build_records(self.trace_dtype, headers, samples, self.sample_interval)
 
-    def open(self, path):
-        pass
+        self.file.write(memoryview(records.view(np.uint8)))
+        self.file.flush()
+        self.ntraces += len(records)
 
 if __name__ == "__main__":
-    su = SU()
\ No newline at end of file
+    su = SU()
@@ -1,63 +1,142 @@
 import dask.array as da
 import numpy as np
 
-def ibm2ieee_dask(ibm):
-	sign = da.bitwise_and(da.right_shift(ibm, 31), 0x01)
-	exponent = da.bitwise_and(da.right_shift(ibm, 24), 0x7f)
-	mantissa = da.bitwise_and(ibm, 0x00ffffff)
-	
-	mantissa = mantissa.astype(np.float32) / pow(2.0, 24.0)
-	ieee = (1.0 - 2.0 * sign) * mantissa * da.power(np.float32(16.0), exponent.astype(np.float32) - 64.0)
-	return ieee
-
-def ibm2ieee(ibm):
-	ibm = ibm.astype(np.int32)
-	sign = ibm >> 31 & 0x01
-	exponent = (ibm >> 24 & 0x7f)
-	mantissa = (ibm & 0x00ffffff)
-	mantissa = (mantissa * np.float32(1.0)) / pow(2.0, 24.0)
-	ieee = (1.0 - 2.0 * sign) * mantissa * np.power(np.float32(16.0), exponent - 64.0)
-	return ieee
-
-def ieee2ibm(ieee):
-	ieee = ieee.astype(np.float32)
-	expmask = 0x7f800000
-	signmask = 0x80000000
-	mantmask = 0x7fffff
-	asint = ieee.view('i4')
-	signbit = asint & signmask
-	exponent = ((asint & expmask) >> 23) - 127
-	# The IBM 7-bit exponent is to the base 16 and the mantissa is presumed to
-	# be entirely to the right of the radix point. In contrast, the IEEE
-	# exponent is to the base 2 and there is an assumed 1-bit to the left of the
-	# radix point.
-	exp16 = ((exponent+1) // 4)
-	exp_remainder = (exponent+1) % 4
-	exp16 += exp_remainder != 0
-	downshift = np.where(exp_remainder, 4-exp_remainder, 0)
-	ibm_exponent = np.clip(exp16 + 64, 0, 127)
-	expbits = ibm_exponent << 24
-	# Add the implicit initial 1-bit to the 23-bit IEEE mantissa to get the
-	# 24-bit IBM mantissa. Downshift it by the remainder from the exponent's
-	# division by 4. It is allowed to have up to 3 leading 0s.
-	ibm_mantissa = ((asint & mantmask) | 0x800000) >> downshift
-	# Special-case 0.0
-	ibm_mantissa = np.where(ieee, ibm_mantissa, 0)
-	expbits = np.where(ieee, expbits, 0)
-	return signbit | expbits | ibm_mantissa
-	
-def ieee2ibm_dask(ieee):
-	ieee = ieee.astype(np.float32)
-	asint = ieee.view('i4')
-	signbit = da.bitwise_and(asint, 0x80000000)
-	exponent = da.right_shift(da.bitwise_and(asint, 0x7f800000), 23) - 127
-	exp16 = ((exponent+1) // 4).astype(np.int32)
-	exp_remainder = ((exponent+1) % 4).astype(np.int32)
-	exp16 += exp_remainder != 0
-	downshift = da.where(exp_remainder, 4-exp_remainder, 0)
-	ibm_exponent = da.clip(exp16 + 64, 0, 127)
-	expbits = da.left_shift(ibm_exponent, 24)
-	ibm_mantissa = da.right_shift(da.bitwise_or(da.bitwise_and(asint, 0x7fffff), 0x800000), downshift)
-	ibm_mantissa = da.where(ieee, ibm_mantissa, 0)
-	expbits = da.where(ieee, expbits, 0)
-	return da.bitwise_or(signbit, da.bitwise_or(expbits, ibm_mantissa))
+# Elements converted per chunk, bounding the size of temporaries
+CHUNK_SIZE = 1 << 20
+
+# Scale of the 24-bit IBM mantissa for each sign + exponent byte:
+# (-1)**sign * 16**(exponent - 64) / 2**24
+IBM_SCALE = np.array([(-1.0) ** (b >> 7) * 16.0 ** ((b & 0x7f) - 64) / 2.0 ** 24 for b in range(256)],
+	dtype=np.float64)
+
+def _as_words(values):
+	"""View 4-byte integer data as uint32, keeping its byte order"""
+	values = np.asarray(values)
+	if values.dtype.kind in 'iu' and values.dtype.itemsize == 4:
+		return values.view(values.dtype.str[0] + 'u4')
+	return values.astype(np.uint32)
+
+def ibm2ieee(ibm, out=None, chunk_size=CHUNK_SIZE):
+	"""Convert IBM single precision floats to IEEE float32.
+
+	Each chunk is a table lookup of the sign and exponent byte and a single
+	multiply of the mantissa, so results are correctly rounded and values
+	outside the float32 range become +-inf or zero.
+
+	Args:
+		ibm: IBM floats as 4-byte integers in any byte order, e.g. a '>u4'
+			view of a SEG-Y trace
+		out: Optional float32 output array of the same shape. It may share
+			memory with ibm for in-place conversion.
+		chunk_size: Number of elements converted at a time
+	Returns:
+		np.ndarray: float32 array
+	"""
+	words = _as_words(ibm)
+	if out is None:
+		out = np.empty(words.shape, dtype=np.float32)
+	if out.dtype != np.float32 or out.shape != words.shape or not out.flags.c_contiguous:
+		raise ValueError("out must be a contiguous float32 array of the input shape")
+	flat_words = words.reshape(-1)
+	flat_out = out.reshape(-1)
+
+	# Overflow to +-inf on the cast to float32 is intended, not worth a warning
+	with np.errstate(over='ignore'):
+		for start in range(0, flat_words.size, chunk_size):
+			chunk = flat_words[start:start + chunk_size].astype(np.uint32)
+			scale = IBM_SCALE[chunk >> 24]
+			np.multiply(chunk & 0x00ffffff, scale, out=flat_out[start:start + chunk_size], casting='unsafe')
+	return out
+
+def ieee2ibm(ieee, out=None, chunk_size=CHUNK_SIZE, byte_order='='):
+	"""Convert IEEE float32 values to IBM single precision floats.
+
+	Works on the float32 bit patterns: the base-2 exponent is rounded up to
+	a base-16 exponent and the mantissa, with its implicit leading bit, is
+	shifted right by the remainder. Zeros and subnormals map to zero, and
+	infinities and NaNs to the largest IBM magnitude.
+
+	Args:
+		ieee: Float values (converted to float32)
+		out: Optional 4-byte integer output array of the same shape
+		chunk_size: Number of elements converted at a time
+		byte_order: Byte order of the returned words when out is None,
+			'>' for big-endian SEG-Y
+	Returns:
+		np.ndarray: IBM floats as uint32 words
+	"""
+	ieee = np.asarray(ieee)
+	if out is None:
+		out = np.empty(ieee.shape, dtype=np.dtype(byte_order + 'u4'))
+	if out.dtype.kind not in 'iu' or out.dtype.itemsize != 4 or out.shape != ieee.shape or not out.flags.c_contiguous:
+		raise ValueError("out must be a contiguous 4-byte integer array of the input shape")
+	flat_ieee = ieee.reshape(-1)
+	flat_out = _as_words(out).reshape(-1)
+
+	for start in range(0, flat_ieee.size, chunk_size):
+		bits = flat_ieee[start:start + chunk_size].astype(np.float32).view(np.uint32)
+		exponent = ((bits >> 23) & 0xff).astype(np.int32)
+		# value = 0.1mantissa * 2**(exponent - 126) = 0.mantissa16 * 16**exp16
+		exp16 = -((126 - exponent) // 4)
+		downshift = (4 * exp16 - (exponent - 126)).astype(np.uint32)
+		mantissa = ((bits & 0x7fffff) | 0x800000) >> downshift
+		ibm = (bits & 0x80000000) | ((exp16 + 64).astype(np.uint32) << 24) | mantissa
+		ibm[exponent == 0] = 0
+		ibm[exponent == 255] = (bits[exponent == 255] & 0x80000000) | 0x7fffffff
+		flat_out[start:start + chunk_size] = ibm
+	return out
+
+def ibm2ieee_dask(ibm, chunk_size=CHUNK_SIZE):
+	"""Convert a dask array of IBM floats to float32 block by block"""
+	return da.map_blocks(ibm2ieee, ibm, chunk_size=chunk_size, dtype=np.float32)
+
+def ieee2ibm_dask(ieee, chunk_size=CHUNK_SIZE, byte_order='='):
+	"""Convert a dask array of floats to IBM floats block by block"""
+	return da.map_blocks(ieee2ibm, ieee, chunk_size=chunk_size, byte_order=byte_order,
+		dtype=np.dtype(byte_order + 'u4'))
+
+def build_header_dtype(fields, itemsize, field_format):
+	"""Compile yaml header field definitions into a numpy structured dtype.
+
+	Args:
+		fields: Mapping of field name to its yaml definition
+		itemsize: Size of the header in bytes
+		field_format: Function of (name, definition) returning the field's
+			(np.dtype, byte offset)
+	Returns:
+		np.dtype: Structured dtype with every field at its byte offset
+	"""
+	names, formats, offsets = [], [], []
+	for name, spec in fields.items():
+		field, offset = field_format(name, spec)
+		names.append(name)
+		formats.append(field)
+		offsets.append(offset)
+	return np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': itemsize})
+
+def pack_records(trace_dtype, headers, samples):
+	"""Pack headers and samples into an array of trace records.
+
+	Args:
+		trace_dtype: Record dtype with 'header' and 'samples' fields
+		headers: Structured array of trace headers. Fields are matched by
+			name and missing fields are written as zero.
+		samples: (ntraces, nsamples) samples, already in the on-disk
+			representation
+	Returns:
+		np.ndarray: Trace records, ready to be written as one buffer
+	"""
+	nsamples = trace_dtype.fields['samples'][0].shape[0]
+	samples = np.asarray(samples)
+	if samples.ndim != 2 or samples.shape[1] != nsamples:
+		raise ValueError(f"Expected samples of shape (ntraces, {nsamples}), got {samples.shape}")
+	if len(headers) != samples.shape[0]:
+		raise ValueError(f"Got {len(headers)} headers for {samples.shape[0]} traces")
+
+	records = np.zeros(samples.shape[0], dtype=trace_dtype)
+	trace_headers = records['header']
+	for name in headers.dtype.names:
+		if name in trace_headers.dtype.names:
+			trace_headers[name] = headers[name]
+	records['samples'] = samples
+	return records
@@ -0,0 +1,99 @@
+"""
+Test doubles for the JavaSeis XML helpers.
+
+pyseis.io.javaseis.xml_io and pyseis.io.javaseis.templates are not part of
+this tree. When they are missing, minimal stand-ins holding just enough of
+the FileProperties, VirtualFolders, TraceHeaders and TraceFile metadata for
+JavaSeis to create, save and load datasets are registered before the tests
+import javaseis. The real modules are always used when they are present.
+"""
+
+import importlib.util
+import sys
+import types
+import xml.etree.ElementTree as ET
+
+
+class JavaSeisXML:
+    """Minimal <par name="..."> reader/writer with the JavaSeisXML interface"""
+
+    @staticmethod
+    def create(template):
+        return ET.ElementTree(ET.fromstring(template))
+
+    @staticmethod
+    def load(path):
+        return ET.parse(path)
+
+    @staticmethod
+    def save(tree, path):
+        tree.write(path)
+
+    @staticmethod
+    def get(tree, name, default=None):
+        element = tree.find(f".//par[@name='{name}']")
+        if element is None or element.text is None:
+            return default
+        return element.text.strip()
+
+    @staticmethod
+    def set(tree, name, value, type=None):
+        element = tree.find(f".//par[@name='{name}']")
+        if element is None:
+            root = tree.getroot() if hasattr(tree, 'getroot') else tree
+            element = ET.SubElement(root, 'par')
+            element.set('name', name)
+        if type:
+            element.set('type', type)
+        if isinstance(value, (list, tuple)):
+            element.text = "\n".join(str(v) for v in value)
+        else:
+            element.text = str(value)
+
+
+FilePropertiesTemplate = """<parset name="JavaSeis Metadata"><parset name="FileProperties">
+<par name="HeaderLengthBytes" type="int">4</par>
+<parset name="TraceProperties"><parset name="entry_0">
+<par name="label" type="string">SEQNO</par>
+<par name="description" type="string">Sequence number</par>
+<par name="format" type="string">INTEGER</par>
+<par name="elementCount" type="int">1</par>
+<par name="byteOffset" type="int">0</par>
+</parset></parset>
+<parset name="CustomProperties"/>
+</parset></parset>"""
+
+VirtualFoldersTemplate = """<parset name="JavaSeis Metadata"><parset name="VirtualFolders">
+<par name="NDIR" type="int">1</par>
+</parset></parset>"""
+
+TraceHeadersTemplate = """<parset name="JavaSeis Metadata"><parset name="ExtentManager">
+<par name="VFIO_VERSION" type="string">2006.2</par>
+</parset></parset>"""
+
+TraceFileTemplate = TraceHeadersTemplate
+
+
+def _install_doubles():
+    if importlib.util.find_spec("pyseis.io.javaseis.xml_io") is None:
+        xml_io = types.ModuleType("pyseis.io.javaseis.xml_io")
+        xml_io.JavaSeisXML = JavaSeisXML
+        sys.modules[xml_io.__name__] = xml_io
+
+    if importlib.util.find_spec("pyseis.io.javaseis.templates") is None:
+        templates = types.ModuleType("pyseis.io.javaseis.templates")
+        templates.FilePropertiesTemplate = FilePropertiesTemplate
+        templates.VirtualFoldersTemplate = VirtualFoldersTemplate
+        templates.TraceHeadersTemplate = TraceHeadersTemplate
+        templates.TraceFileTemplate = TraceFileTemplate
+        templates.js_xml = {
+            'FileProperties': FilePropertiesTemplate,
+            'VirtualFolders': VirtualFoldersTemplate,
+            'TraceHeaders': TraceHeadersTemplate,
+            'TraceFile': TraceFileTemplate,
+        }
+        templates.__all__ = ['js_xml']
+        sys.modules[templates.__name__] = templates
+
+
+_install_doubles()
@@ -0,0 +1,729 @@
+import os
+import tempfile
+import numpy as np
+import unittest
+from unittest import mock
+import xml.etree.ElementTree as ET
+from construct import Container
+
+from pyseis.io.javaseis.xml_io import JavaSeisXML
+from pyseis.io.javaseis.templates import FilePropertiesTemplate, TraceFileTemplate
+from pyseis.io.javaseis import javaseis
+from pyseis.io.javaseis.javaseis import JavaSeis, ExtentManager
+from pyseis.io.javaseis.js_models import (CompressedInt16Adapter, CompressedInt16Codec, CompressedInt08Codec,
+                                          FloatCodec, build_header_dtype)
+
+
+def _adapter_bytes(adapter, trace):
+    """Encode one trace with the construct adapter, padded as written on disk"""
+    compressed = adapter._encode(trace, None, None)
+    samples = compressed.samples.astype(adapter.byte_order + 'u2')
+    if trace.size % 2 != 0:
+        samples = np.append(samples, np.uint16(32767)).astype(adapter.byte_order + 'u2')
+    return compressed.scalars.astype(adapter.byte_order + 'f4').tobytes() + samples.tobytes()
+
+
+class CompressedInt16CodecTests(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.traces = (rng.standard_normal((6, 251)) * 1000).astype(np.float32)
+        self.traces[1, 100:200] = 0.0  # dead window
+        self.traces[2] = 0.0  # dead trace
+
+    def test_encode_matches_adapter(self):
+        for byte_order in ('little', 'big'):
+            adapter = CompressedInt16Adapter(self.traces.shape[1], byte_order)
+            codec = CompressedInt16Codec(self.traces.shape[1], byte_order)
+            encoded = codec.encode(self.traces)
+            self.assertEqual(encoded.shape, (self.traces.shape[0], codec.trclen))
+            for i, trace in enumerate(self.traces):
+                self.assertEqual(encoded[i].tobytes(), _adapter_bytes(adapter, trace))
+
+    def test_decode_matches_adapter(self):
+        for byte_order in ('little', 'big'):
+            adapter = CompressedInt16Adapter(self.traces.shape[1], byte_order)
+            codec = CompressedInt16Codec(self.traces.shape[1], byte_order)
+            encoded = codec.encode(self.traces)
+            decoded = codec.decode(encoded.tobytes())
+            for i, trace in enumerate(self.traces):
+                compressed = adapter._encode(trace, None, None)
+                expected = adapter._decode(Container(scalars=list(compressed.scalars),
+                                                     samples=list(compressed.samples)), None, None)
+                np.testing.assert_array_equal(decoded[i].view(np.uint32), expected.view(np.uint32))
+
+
+class TraceFormatTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "test.js")
+        rng = np.random.default_rng(4)
+        self.traces = (rng.standard_normal((12, 251)) * 100).astype(np.float32)
+        self.traces[3] = 0.0  # dead trace
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_int08_codec(self):
+        for byte_order in ('little', 'big'):
+            codec = CompressedInt08Codec(251, byte_order)
+            self.assertEqual(codec.trclen, 4 * 3 + 252)
+            decoded = codec.decode(codec.encode(self.traces))
+            scale = np.abs(self.traces).max(axis=1, keepdims=True) / 126.0
+            self.assertTrue(np.all(np.abs(decoded - self.traces) <= scale))
+            np.testing.assert_array_equal(decoded[3], 0.0)
+
+    def test_float_codec_is_a_view(self):
+        codec = FloatCodec(251, 'big')
+        encoded = codec.encode(self.traces)
+        decoded = codec.decode(encoded)
+        self.assertTrue(np.shares_memory(decoded, encoded))
+        self.assertEqual(decoded.dtype, np.dtype('>f4'))
+        np.testing.assert_array_equal(decoded, self.traces)
+
+    def test_datasets_round_trip(self):
+        for trace_format, codec in (("FLOAT", FloatCodec(251)), ("COMPRESSED_INT08", CompressedInt08Codec(251))):
+            dataset = JavaSeis()
+            dataset.create_new(samples=251, traces=4, frames=3, trace_format=trace_format)
+            dataset.save(self.path)
+            headers = np.zeros(12, dtype=dataset.header_dtype)
+            dataset.write_traces(0, self.traces, headers)
+
+            for options in ({"use_mmap": True}, {"max_workers": 2}, {}):
+                loaded = JavaSeis(**options)
+                loaded.load(self.path)
+                expected = codec.decode(codec.encode(self.traces))
+                traces = loaded.get_traces(2, 7)
+                if options:
+                    np.testing.assert_array_equal(traces, expected[2:9])
+                    np.testing.assert_array_equal(loaded.get_traces(2, 7, samples=slice(120, 230)),
+                                                  expected[2:9, 120:230])
+                else:
+                    np.testing.assert_array_equal(np.array(traces), expected[2:9])
+
+
+class MemoryMappedReadTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "test.js")
+        self.nsamples, self.ntraces, self.nframes = 251, 5, 3
+
+        dataset = JavaSeis()
+        dataset.create_new(self.nsamples, self.ntraces, self.nframes)
+        dataset.add_header(label="FFID", description="Field File Identifier", format="INTEGER")
+        dataset.save(self.path)
+
+        rng = np.random.default_rng(1)
+        total = self.ntraces * self.nframes
+        self.traces = (rng.standard_normal((total, self.nsamples)) * 100).astype(np.float32)
+        with open(os.path.join(self.path, "TraceFile0"), "r+b") as trace_file, \
+             open(os.path.join(self.path, "TraceHeaders0"), "r+b") as header_file:
+            for i, trace in enumerate(self.traces):
+                dataset.write_trace(trace, {"SEQNO": i + 1, "FFID": 100 + i // self.ntraces},
+                                    trace_file, header_file)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_get_traces_and_headers_as_arrays(self):
+        dataset = JavaSeis(use_mmap=True)
+        dataset.load(self.path)
+        traces = dataset.get_traces(3, 9)
+        headers = dataset.get_headers(3, 9)
+
+        codec = CompressedInt16Codec(self.nsamples)
+        np.testing.assert_array_equal(traces, codec.decode(codec.encode(self.traces[3:12])))
+        np.testing.assert_array_equal(headers["SEQNO"], np.arange(4, 13))
+        np.testing.assert_array_equal(headers["FFID"], 100 + np.arange(3, 12) // self.ntraces)
+
+    def test_read_frame_uses_trace_map_fold(self):
+        np.array([5, 2, 0], dtype='<i4').tofile(os.path.join(self.path, "TraceMap"))
+        dataset = JavaSeis(use_mmap=True)
+        dataset.load(self.path)
+
+        traces, headers = dataset.read_frame(1)
+        self.assertEqual(traces.shape, (2, self.nsamples))
+        np.testing.assert_array_equal(headers["SEQNO"], [6, 7])
+
+        frames = [(volume, frame, len(headers)) for volume, frame, _, headers in dataset.iter_frames()]
+        self.assertEqual(frames, [(0, 0, 5), (0, 1, 2)])
+        with self.assertRaises(IndexError):
+            dataset.read_frame(3)
+
+    def test_partial_sample_window(self):
+        codec = CompressedInt16Codec(self.nsamples)
+        expected = codec.decode(codec.encode(self.traces[3:12]))
+        for options in ({"use_mmap": True}, {"max_workers": 2}):
+            dataset = JavaSeis(**options)
+            dataset.load(self.path)
+            np.testing.assert_array_equal(dataset.get_traces(3, 9, samples=slice(150, 251)),
+                                          expected[:, 150:])
+            np.testing.assert_array_equal(dataset.get_traces(3, 9, samples=slice(99, 101)),
+                                          expected[:, 99:101])
+            np.testing.assert_array_equal(dataset.get_traces(3, 9, time_range=(120.0, 130.0)),
+                                          expected[:, 120:131])
+            traces, _ = dataset.read_frame(1, samples=slice(0, 10))
+            np.testing.assert_array_equal(traces, expected[2:7, :10])
+            with self.assertRaises(ValueError):
+                dataset.get_traces(3, 9, samples=slice(0, 10, 2))
+
+    def test_sample_window_reads_in_bulk(self):
+        dataset = JavaSeis(max_workers=2)
+        dataset.load(self.path)
+        with mock.patch("pyseis.io.javaseis.javaseis._pread_into", wraps=javaseis._pread_into) as pread:
+            dataset.get_traces(0, 15, samples=slice(100, 110))
+        self.assertEqual(pread.call_count, 1)
+
+    def test_read_array_crosses_extents(self):
+        records = np.arange(10 * 8, dtype=np.uint8).reshape(10, 8)
+        paths = []
+        for i, block in enumerate((records[:4], records[4:8], records[8:])):
+            paths.append(os.path.join(self.tmpdir.name, f"TraceFile{i}"))
+            block.tofile(paths[-1])
+
+        tree = JavaSeisXML.create(TraceFileTemplate)
+        JavaSeisXML.set(tree, "VFIO_EXTSIZE", "32")
+        manager = ExtentManager(paths, None, tree, trace_size=8, use_mmap=True)
+        np.testing.assert_array_equal(manager.read_array(2, 7), records[2:9])
+
+
+class FrameWriteTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "test.js")
+        self.dataset = JavaSeis()
+        self.dataset.create_new(samples=301, traces=4, frames=3)
+        self.dataset.add_header(label="FFID", description="Field File Identifier", format="INTEGER")
+        self.dataset.save(self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_write_frame_round_trip(self):
+        rng = np.random.default_rng(2)
+        traces = rng.standard_normal((3, 301)).astype(np.float32)
+        headers = np.zeros(3, dtype=[("FFID", "i4"), ("SEQNO", "i4"), ("UNUSED", "f8")])
+        headers["FFID"] = 1001
+        headers["SEQNO"] = [1, 2, 3]
+        self.dataset.write_frame(1, traces, headers)
+
+        dataset = JavaSeis(use_mmap=True)
+        dataset.load(self.path)
+        self.assertEqual(dataset.get_fold(1), 3)
+        read_traces, read_headers = dataset.read_frame(1)
+
+        codec = CompressedInt16Codec(301)
+        np.testing.assert_array_equal(read_traces, codec.decode(codec.encode(traces)))
+        np.testing.assert_array_equal(read_headers["FFID"], [1001] * 3)
+        np.testing.assert_array_equal(read_headers["SEQNO"], [1, 2, 3])
+
+    def test_write_rejects_oversized_frame(self):
+        traces = np.zeros((5, 301), dtype=np.float32)
+        with self.assertRaises(ValueError):
+            self.dataset.write_frame(0, traces, np.zeros(5, dtype=self.dataset.header_dtype))
+
+    def test_loaded_dataset_is_read_only(self):
+        dataset = JavaSeis()
+        dataset.load(self.path)
+        with self.assertRaises(ValueError):
+            dataset.write_traces(0, np.zeros((1, 301)), np.zeros(1, dtype=dataset.header_dtype))
+
+
+class FrameCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "test.js")
+        dataset = JavaSeis()
+        dataset.create_new(samples=100, traces=4, frames=3)
+        dataset.save(self.path)
+        self.frame_bytes = 4 * 100 * 4 + 4 * dataset.header_dtype.itemsize
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_hits_misses_and_evictions(self):
+        dataset = JavaSeis(use_mmap=True, cache_bytes=2 * self.frame_bytes)
+        dataset.load(self.path)
+        for frame in (0, 1, 0, 2, 1):
+            dataset.read_frame(frame)
+        stats = dataset.frame_cache.stats
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 4, 2))
+        self.assertEqual(stats['nbytes'], 2 * self.frame_bytes)
+
+        # A range inside a cached frame is served from the cache with one lookup
+        dataset.get_traces(5, 2)
+        self.assertEqual(dataset.frame_cache.hits, 2)
+        dataset.get_traces(5, 2, samples=slice(10, 20))
+        self.assertEqual(dataset.frame_cache.hits, 3)
+
+    def test_header_reads_bypass_cache(self):
+        dataset = JavaSeis(use_mmap=True, cache_bytes=2 * self.frame_bytes)
+        dataset.load(self.path)
+        with mock.patch.object(dataset, "_read_traces", wraps=dataset._read_traces) as read_traces:
+            dataset.get_headers(0, 1)
+        read_traces.assert_not_called()
+        self.assertEqual(dataset.frame_cache.stats['misses'], 0)
+
+    def test_write_invalidates_frame(self):
+        dataset = JavaSeis(use_mmap=True, cache_bytes=10 * self.frame_bytes)
+        dataset.create_new(samples=100, traces=4, frames=3)
+        dataset.save(self.path)
+        before, _ = dataset.read_frame(1)
+
+        traces = np.ones((4, 100), dtype=np.float32)
+        dataset.write_frame(1, traces, np.zeros(4, dtype=dataset.header_dtype))
+        after, _ = dataset.read_frame(1)
+        np.testing.assert_array_equal(before, 0)
+        np.testing.assert_array_equal(after, 1)
+        self.assertFalse(after.flags.writeable)
+
+    def test_cache_cleared_on_load(self):
+        other = os.path.join(self.tmpdir.name, "other.js")
+        writer = JavaSeis()
+        writer.create_new(samples=100, traces=4, frames=3)
+        writer.save(other)
+        writer.write_frame(0, np.ones((4, 100), dtype=np.float32), np.zeros(4, dtype=writer.header_dtype))
+        writer.close()
+
+        dataset = JavaSeis(use_mmap=True, cache_bytes=10 * self.frame_bytes)
+        dataset.load(self.path)
+        np.testing.assert_array_equal(dataset.read_frame(0)[0], 0.0)
+        dataset.load(other)
+        np.testing.assert_array_equal(dataset.read_frame(0)[0], 1.0)
+        dataset.close()
+
+    def test_cache_requires_array_io(self):
+        with self.assertRaises(ValueError):
+            JavaSeis(cache_bytes=1024)
+
+
+class MultiExtentTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "primary", "test.js")
+        self.secondary = os.path.join(self.tmpdir.name, "secondary")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_extents_split_by_count_across_folders(self):
+        dataset = JavaSeis()
+        dataset.create_new(samples=101, traces=4, frames=5, extent_count=3, secondary_paths=[self.secondary])
+        dataset.save(self.path)
+
+        trclen = dataset.trace_codec.trclen
+        self.assertEqual(JavaSeisXML.get(dataset.xml["TraceFile"], "VFIO_MAXFILE"), "3")
+        self.assertEqual(JavaSeisXML.get(dataset.xml["TraceFile"], "VFIO_EXTSIZE"), str(2 * 4 * trclen))
+        self.assertEqual(JavaSeisXML.get(dataset.xml["TraceFile"], "VFIO_MAXPOS"), str(5 * 4 * trclen))
+        self.assertEqual(os.path.getsize(os.path.join(self.path, "TraceFile0")), 8 * trclen)
+        self.assertEqual(os.path.getsize(os.path.join(self.secondary, "test.js", "TraceFile1")), 8 * trclen)
+        self.assertEqual(os.path.getsize(os.path.join(self.path, "TraceFile2")), 4 * trclen)
+
+        traces = np.arange(20 * 101, dtype=np.float32).reshape(20, 101)
+        headers = np.zeros(20, dtype=dataset.header_dtype)
+        headers["SEQNO"] = np.arange(20)
+        for frame in range(5):
+            dataset.write_frame(frame, traces[4 * frame:4 * frame + 4], headers[4 * frame:4 * frame + 4])
+
+        dataset = JavaSeis(use_mmap=True)
+        dataset.load(self.path)
+        codec = CompressedInt16Codec(101)
+        np.testing.assert_array_equal(dataset.get_traces(0, 20), codec.decode(codec.encode(traces)))
+        np.testing.assert_array_equal(dataset.get_headers(0, 20)["SEQNO"], np.arange(20))
+
+    def test_concurrent_reader_matches_mmap(self):
+        from pyseis.io.javaseis import javaseis
+
+        dataset = JavaSeis()
+        dataset.create_new(samples=101, traces=4, frames=5, extent_count=3)
+        dataset.save(self.path)
+        traces = np.random.default_rng(3).standard_normal((20, 101)).astype(np.float32)
+        headers = np.zeros(20, dtype=dataset.header_dtype)
+        headers["SEQNO"] = np.arange(20)
+        dataset.write_traces(0, traces, headers)
+
+        mapped = JavaSeis(use_mmap=True)
+        mapped.load(self.path)
+        concurrent = JavaSeis(max_workers=4)
+        concurrent.load(self.path)
+
+        chunk_bytes = javaseis.READ_CHUNK_BYTES
+        javaseis.READ_CHUNK_BYTES = 3 * dataset.trace_codec.trclen
+        try:
+            np.testing.assert_array_equal(concurrent.get_traces(1, 18), mapped.get_traces(1, 18))
+            np.testing.assert_array_equal(concurrent.get_headers(1, 18), mapped.get_headers(1, 18))
+        finally:
+            javaseis.READ_CHUNK_BYTES = chunk_bytes
+
+    @unittest.skipUnless(os.path.isdir("/proc/self/fd"), "needs /proc to count open files")
+    def test_mmap_respects_max_open_files(self):
+        dataset = JavaSeis()
+        dataset.create_new(samples=101, traces=4, frames=40, extent_count=40)
+        dataset.save(self.path)
+        dataset.close()
+
+        def open_fds():
+            return len(os.listdir("/proc/self/fd"))
+
+        with JavaSeis(use_mmap=True, max_open_files=2) as mapped:
+            mapped.load(self.path)
+            before = open_fds()
+            for frame in range(40):
+                traces, headers = mapped.read_frame(frame)
+            del traces, headers
+            self.assertLessEqual(len(mapped.trace_manager._maps), 2)
+            self.assertLessEqual(len(mapped.header_manager._maps), 2)
+            self.assertLessEqual(open_fds() - before, 4)
+
+    def test_concurrent_consumers_share_one_dataset(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        dataset = JavaSeis()
+        dataset.create_new(samples=101, traces=4, frames=6, extent_count=3)
+        dataset.save(self.path)
+        traces = np.random.default_rng(4).standard_normal((24, 101)).astype(np.float32)
+        headers = np.zeros(24, dtype=dataset.header_dtype)
+        headers["SEQNO"] = np.arange(24)
+        dataset.write_traces(0, traces, headers)
+        expected = CompressedInt16Codec(101).decode(CompressedInt16Codec(101).encode(traces))
+
+        with JavaSeis(max_workers=2, max_open_files=1) as shared:
+            shared.load(self.path)
+
+            def check(start):
+                count = 24 - start
+                np.testing.assert_array_equal(shared.get_traces(start, count), expected[start:])
+                np.testing.assert_array_equal(shared.get_headers(start, count)["SEQNO"], np.arange(start, 24))
+
+            with ThreadPoolExecutor(8) as pool:
+                list(pool.map(check, list(range(24)) * 4))
+
+    def test_extent_size_holds_whole_frames(self):
+        dataset = JavaSeis()
+        dataset.create_new(samples=100, traces=10, frames=7, extent_size=10000)
+        trclen = dataset.trace_codec.trclen
+        self.assertEqual(JavaSeisXML.get(dataset.xml["TraceFile"], "VFIO_EXTSIZE"), str(10 * trclen * 4))
+        self.assertEqual(JavaSeisXML.get(dataset.xml["TraceFile"], "VFIO_MAXFILE"), "2")
+        self.assertEqual(JavaSeisXML.get(dataset.xml["TraceHeaders"], "VFIO_MAXFILE"), "2")
+
+
+class HeaderIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "test.js")
+        dataset = JavaSeis()
+        dataset.create_new(samples=50, traces=4, frames=3)
+        dataset.add_header(label="OFFSET", description="Offset", format="INTEGER")
+        dataset.save(self.path)
+
+        self.traces = np.arange(12 * 50, dtype=np.float32).reshape(12, 50)
+        headers = np.zeros(12, dtype=dataset.header_dtype)
+        headers["SEQNO"] = np.arange(12)
+        headers["OFFSET"] = np.tile([300, 100, 200, 100], 3)
+        for frame in range(3):
+            fold = 4 if frame < 2 else 3
+            rows = slice(4 * frame, 4 * frame + fold)
+            dataset.write_frame(frame, self.traces[rows], headers[rows])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_select_value_and_range(self):
+        dataset = JavaSeis(use_mmap=True)
+        dataset.load(self.path)
+        np.testing.assert_array_equal(dataset.find(OFFSET=100), [1, 3, 5, 7, 9])
+        self.assertTrue(os.path.exists(os.path.join(self.path, "TraceIndex-OFFSET.npy")))
+
+        traces, headers = dataset.select(OFFSET=(150, 300), SEQNO=(0, 8))
+        np.testing.assert_array_equal(headers["SEQNO"], [0, 2, 4, 6, 8])
+        self.assertEqual(traces.shape, (5, 50))
+
+        reloaded = JavaSeis()
+        reloaded.load(self.path)
+        traces, headers = reloaded.select(OFFSET=200)
+        self.assertEqual([h["SEQNO"] for h in headers], [2, 6, 10])
+
+    def test_write_drops_stale_index(self):
+        dataset = JavaSeis(use_mmap=True)
+        dataset.load(self.path)
+        dataset.build_index("OFFSET")
+        dataset.writable = True
+        dataset.map_extents()
+        dataset.set_fold(2, 4)
+        self.assertFalse(os.path.exists(os.path.join(self.path, "TraceIndex-OFFSET.npy")))
+        np.testing.assert_array_equal(dataset.find(OFFSET=0), [11])
+
+    def test_indexes_reset_on_load(self):
+        other = os.path.join(self.tmpdir.name, "other.js")
+        writer = JavaSeis()
+        writer.create_new(samples=50, traces=4, frames=1)
+        writer.save(other)
+        headers = np.zeros(4, dtype=writer.header_dtype)
+        headers["SEQNO"] = 2
+        writer.write_frame(0, self.traces[:4], headers)
+        writer.close()
+
+        dataset = JavaSeis(use_mmap=True)
+        dataset.load(self.path)
+        np.testing.assert_array_equal(dataset.find(SEQNO=1), [1])
+        dataset.load(other)
+        np.testing.assert_array_equal(dataset.find(SEQNO=2), [0, 1, 2, 3])
+        dataset.close()
+
+    def test_column_update_keeps_other_indexes(self):
+        dataset = JavaSeis(use_mmap=True)
+        dataset.load(self.path, mode='r+')
+        dataset.build_index("OFFSET")
+        dataset.build_index("SEQNO")
+        dataset.update_header_column("OFFSET", np.array([5], dtype=np.int32))
+        dataset.update_header_column("OFFSET", np.array([6], dtype=np.int32))
+        self.assertFalse(os.path.exists(os.path.join(self.path, "TraceIndex-OFFSET.npy")))
+        self.assertTrue(os.path.exists(os.path.join(self.path, "TraceIndex-SEQNO.npy")))
+        self.assertIn("SEQNO", dataset.indexes)
+        np.testing.assert_array_equal(dataset.find(OFFSET=6), [0])
+
+    def test_header_update_mode(self):
+        trace_file = os.path.join(self.path, "TraceFile0")
+        with open(trace_file, "rb") as f:
+            trace_bytes = f.read()
+
+        dataset = JavaSeis()
+        dataset.load(self.path)
+        with self.assertRaises(ValueError):
+            dataset.update_header_column("OFFSET", np.zeros(3, dtype=np.int32))
+
+        for options in ({"max_workers": 2}, {"use_mmap": True}):
+            dataset = JavaSeis(cache_bytes=1 << 20, **options)
+            dataset.load(self.path, mode='r+')
+            dataset.read_frame(1)
+            dataset.get_index("OFFSET")
+            dataset.update_header_column("OFFSET", np.array([7, 8, 9], dtype=np.int32), start=4)
+            headers = dataset.read_frame(1)[1]
+            np.testing.assert_array_equal(headers["OFFSET"], [7, 8, 9, 100])
+            np.testing.assert_array_equal(headers["SEQNO"], [4, 5, 6, 7])
+            np.testing.assert_array_equal(dataset.find(OFFSET=100), [1, 3, 7, 9])
+
+            replacement = np.zeros(2, dtype=[("SEQNO", "<i4")])
+            replacement["SEQNO"] = [40, 41]
+            dataset.write_headers(10, replacement)
+            np.testing.assert_array_equal(dataset.get_headers(10, 2)["SEQNO"], [40, 41])
+            np.testing.assert_array_equal(dataset.get_headers(10, 2)["OFFSET"], [0, 0])
+            dataset.close()
+
+        with open(trace_file, "rb") as f:
+            self.assertEqual(f.read(), trace_bytes)
+
+
+class AppendFrameTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "test.js")
+        self.traces = np.random.default_rng(5).standard_normal((20, 50)).astype(np.float32)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _headers(self, dataset, first, count):
+        headers = np.zeros(count, dtype=dataset.header_dtype)
+        headers["SEQNO"] = np.arange(first, first + count)
+        return headers
+
+    def test_append_grows_frames_and_extents(self):
+        dataset = JavaSeis(use_mmap=True)
+        dataset.create_new(samples=50, traces=4, frames=0, extent_size=2 * 4 * 104)
+        dataset.save(self.path)
+        self.assertEqual(dataset.trace_codec.trclen, 104)
+        with self.assertRaises(IndexError):
+            dataset.read_frame(0)
+        with self.assertRaises(IndexError):
+            dataset.get_fold(0)
+
+        folds = [4, 2, 4, 3, 1]
+        for i, fold in enumerate(folds):
+            self.assertEqual(dataset.append_frame(self.traces[4 * i:4 * i + fold],
+                                                  self._headers(dataset, 4 * i, fold)), i)
+            # Readable while it grows
+            np.testing.assert_array_equal(dataset.read_frame(i)[1]["SEQNO"], np.arange(4 * i, 4 * i + fold))
+        dataset.close()
+
+        self.assertTrue(os.path.exists(os.path.join(self.path, "TraceFile2")))
+        dataset = JavaSeis(use_mmap=True)
+        dataset.load(self.path, mode='a')
+        self.assertEqual(dataset.axis_lengths, [50, 4, 5])
+        np.testing.assert_array_equal(dataset.trace_map, folds)
+        self.assertEqual(dataset.append_frame(self.traces[:2], self._headers(dataset, 100, 2)), 5)
+
+        dataset = JavaSeis(use_mmap=True)
+        dataset.load(self.path)
+        np.testing.assert_array_equal(dataset.trace_map, folds + [2])
+        self.assertEqual(JavaSeisXML.get(dataset.xml["TraceFile"], "VFIO_MAXPOS"), str(6 * 4 * 104))
+        self.assertEqual(JavaSeisXML.get(dataset.xml["TraceFile"], "VFIO_MAXFILE"), "3")
+        codec = CompressedInt16Codec(50)
+        np.testing.assert_array_equal(dataset.read_frame(3)[0], codec.decode(codec.encode(self.traces[12:15])))
+        np.testing.assert_array_equal(dataset.read_frame(5)[1]["SEQNO"], [100, 101])
+        self.assertEqual(len(dataset.find(SEQNO=(0, 19))), 14)
+
+    def test_append_grows_volumes(self):
+        dataset = JavaSeis()
+        dataset.create_new(samples=50, traces=4, frames=2, volumes=0)
+        dataset.save(self.path)
+        for i in range(3):
+            dataset.append_frame(self.traces[4 * i:4 * i + 4], self._headers(dataset, 4 * i, 4))
+
+        dataset = JavaSeis(max_workers=2)
+        dataset.load(self.path)
+        self.assertEqual(dataset.axis_lengths, [50, 4, 2, 2])
+        np.testing.assert_array_equal(dataset.trace_map, [4, 4, 4, 0])
+        self.assertEqual([(v, f) for v, f, _, _ in dataset.iter_frames()], [(0, 0), (0, 1), (1, 0)])
+
+    def test_append_requires_writable(self):
+        dataset = JavaSeis()
+        dataset.create_new(samples=50, traces=4, frames=1)
+        dataset.save(self.path)
+        dataset = JavaSeis()
+        dataset.load(self.path)
+        with self.assertRaises(ValueError):
+            dataset.append_frame(self.traces[:4], self._headers(dataset, 0, 4))
+
+
+class DaskViewTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "test.js")
+        dataset = JavaSeis()
+        dataset.create_new(samples=50, traces=4, frames=3, volumes=2)
+        dataset.save(self.path)
+        self.traces = np.random.default_rng(6).standard_normal((24, 50)).astype(np.float32)
+        headers = np.zeros(24, dtype=dataset.header_dtype)
+        headers["SEQNO"] = np.arange(1, 25)
+        dataset.write_traces(0, self.traces, headers)
+        dataset.set_fold(1, 2, volume=1)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_to_dask_matches_frame_reader(self):
+        dataset = JavaSeis(use_mmap=True)
+        dataset.load(self.path)
+        traces, headers = dataset.to_dask(frames_per_chunk=2)
+        self.assertEqual(traces.shape, (2, 3, 4, 50))
+        self.assertEqual(traces.chunks[1], (2, 1))
+        self.assertEqual(headers.shape, (2, 3, 4))
+
+        traces, headers = traces.compute(), headers.compute()
+        for volume in range(2):
+            for frame in range(3):
+                expected_traces, expected_headers = dataset.read_frame(frame, volume)
+                fold = len(expected_headers)
+                np.testing.assert_array_equal(traces[volume, frame, :fold], expected_traces)
+                np.testing.assert_array_equal(headers[volume, frame, :fold]["SEQNO"], expected_headers["SEQNO"])
+        np.testing.assert_array_equal(traces[1, 1, 2:], 0.0)
+        np.testing.assert_array_equal(headers[1, 1, 2:]["SEQNO"], 0)
+
+    def test_to_dask_headers_skip_traces(self):
+        dataset = JavaSeis(use_mmap=True)
+        dataset.load(self.path)
+        traces, headers = dataset.to_dask()
+        with mock.patch.object(dataset, "_read_traces", wraps=dataset._read_traces) as read_traces, \
+             mock.patch.object(dataset, "_read_headers", wraps=dataset._read_headers) as read_headers:
+            headers.compute()
+            read_traces.assert_not_called()
+            traces.compute()
+            self.assertEqual(read_headers.call_count, len(np.flatnonzero(dataset.trace_map)))
+
+    def test_to_dask_requires_array_io(self):
+        dataset = JavaSeis()
+        dataset.load(self.path)
+        with self.assertRaises(ValueError):
+            dataset.to_dask()
+
+
+class SegyConversionTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_parallel_segy_to_javaseis(self):
+        from pyseis.io.convert import segy_to_javaseis
+        from pyseis.io.segy.segy import build_header_dtype as build_segy_header_dtype, load_segy_format
+        from pyseis.io.utils import ieee2ibm
+        from tests.test_segy import write_segy
+
+        traces = np.random.default_rng(7).standard_normal((23, 60)).astype(np.float32)
+        segy_headers = np.zeros(23, dtype=build_segy_header_dtype(load_segy_format()['trace_header'], 240))
+        segy_headers['fldr'] = 500 + np.arange(23) // 5
+        segy_headers['offset'] = np.arange(23) * 25
+        segy_path = os.path.join(self.tmpdir.name, "test.sgy")
+        write_segy(segy_path, ieee2ibm(traces, byte_order='>'), 1, segy_headers)
+        js_path = os.path.join(self.tmpdir.name, "test.js")
+
+        segy_to_javaseis(segy_path, js_path, traces_per_frame=5, max_workers=3, chunk_traces=4,
+                         trace_format="FLOAT")
+
+        dataset = JavaSeis(use_mmap=True)
+        dataset.load(js_path)
+        self.assertEqual(dataset.axis_lengths, [60, 5, 5])
+        np.testing.assert_array_equal(dataset.trace_map, [5, 5, 5, 5, 3])
+        np.testing.assert_allclose(dataset.get_traces(0, 23), traces, rtol=2.0 ** -20)
+        headers = dataset.get_headers(0, 23)
+        np.testing.assert_array_equal(headers["SEQNO"], np.arange(1, 24))
+        np.testing.assert_array_equal(headers["FFID"], segy_headers['fldr'])
+        np.testing.assert_array_equal(headers["OFFSET"], segy_headers['offset'])
+        np.testing.assert_array_equal(dataset.read_frame(4)[1]["FFID"], [504, 504, 504])
+
+
+class HeaderDtypeTests(unittest.TestCase):
+
+    def _properties(self, byte_order, header_length, entries):
+        tree = JavaSeisXML.create(FilePropertiesTemplate)
+        JavaSeisXML.set(tree, "ByteOrder", byte_order)
+        JavaSeisXML.set(tree, "HeaderLengthBytes", str(header_length))
+        trace_props = tree.find(".//parset[@name='TraceProperties']")
+        for entry in trace_props.findall("parset"):
+            trace_props.remove(entry)
+        for i, (label, fmt, count, offset) in enumerate(entries):
+            entry = ET.SubElement(trace_props, "parset", name=f"entry_{i}")
+            for name, value in [("label", label), ("format", fmt),
+                                ("elementCount", str(count)), ("byteOffset", str(offset))]:
+                par = ET.SubElement(entry, "par", name=name)
+                par.text = value
+        return tree
+
+    def test_offsets_counts_and_padding(self):
+        tree = self._properties("LITTLE_ENDIAN", 64, [
+            ("SEQNO", "INTEGER", 1, 0),
+            ("OFFSET", "DOUBLE", 1, 8),
+            ("COORDS", "FLOAT", 3, 16),
+            ("TRC_TYPE", "LONG", 1, 40),
+        ])
+        dtype = build_header_dtype(tree)
+        self.assertEqual(dtype.itemsize, 64)
+        self.assertEqual(dtype.fields["OFFSET"][1], 8)
+        self.assertEqual(dtype.fields["COORDS"][0].shape, (3,))
+        self.assertEqual(dtype.fields["TRC_TYPE"][1], 40)
+
+        raw = np.zeros(2 * 64, dtype=np.uint8)
+        raw[64 + 8:64 + 16] = np.frombuffer(np.float64(12.5).tobytes(), dtype=np.uint8)
+        headers = np.frombuffer(raw.tobytes(), dtype=dtype)
+        self.assertEqual(headers["OFFSET"][1], 12.5)
+
+    def test_big_endian(self):
+        tree = self._properties("BIG_ENDIAN", 4, [("SEQNO", "INTEGER", 1, 0)])
+        headers = np.frombuffer(b"\x00\x00\x01\x02", dtype=build_header_dtype(tree))
+        self.assertEqual(headers["SEQNO"][0], 258)
+
+    def test_header_length_too_short(self):
+        tree = self._properties("LITTLE_ENDIAN", 4, [("OFFSET", "DOUBLE", 1, 0)])
+        with self.assertRaises(ValueError):
+            build_header_dtype(tree)
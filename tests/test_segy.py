@@ -0,0 +1,325 @@
+import os
+import tempfile
+import numpy as np
+import unittest
+import warnings
+from unittest import mock
+
+from pyseis.io.segy.segy import SegyReader, SegyWriter, load_segy_format, build_header_dtype
+from pyseis.io.utils import ibm2ieee, ieee2ibm, ibm2ieee_dask, ieee2ibm_dask
+
+
+def write_segy(path, samples, format_code, headers=None, extended_headers=0, byte_order='>', numhdr=None):
+    """Write a minimal SEG-Y file, big-endian unless byte_order is '<'.
+
+    The last extended textual header holds the ((SEG: EndText)) stanza, and
+    numhdr overrides the count recorded in the binary header.
+    """
+    segy_format = load_segy_format()
+    binary_dtype = build_header_dtype(segy_format['binary_header'], 400, byte_order)
+    header_dtype = build_header_dtype(segy_format['trace_header'], 240, byte_order)
+
+    binary = np.zeros(1, dtype=binary_dtype)
+    binary['hns'] = len(samples[0])
+    binary['hdt'] = 2000
+    binary['format'] = format_code
+    if extended_headers:
+        binary['segyrev'] = 0x0100
+        binary['numhdr'] = extended_headers if numhdr is None else numhdr
+
+    trace_headers = np.zeros(len(samples), dtype=header_dtype) if headers is None else headers
+    with open(path, 'wb') as f:
+        f.write("C 1 TEST".ljust(3200).encode('cp500'))
+        f.write(binary.tobytes())
+        if extended_headers:
+            f.write(b"\x40" * 3200 * (extended_headers - 1))
+            f.write("((SEG: EndText))".ljust(3200).encode('cp500'))
+        for header, trace in zip(trace_headers, samples):
+            f.write(header.tobytes())
+            f.write(trace.tobytes())
+    return header_dtype
+
+
+class SegyReaderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "test.sgy")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_ieee_traces_and_headers(self):
+        samples = np.random.default_rng(0).standard_normal((7, 33)).astype('>f4')
+        header_dtype = build_header_dtype(load_segy_format()['trace_header'], 240)
+        headers = np.zeros(7, dtype=header_dtype)
+        headers['fldr'] = 1001
+        headers['tracf'] = np.arange(1, 8)
+        headers['scalco'] = -100
+        write_segy(self.path, samples, 5, headers, extended_headers=2)
+
+        with SegyReader(self.path) as segy:
+            self.assertEqual(len(segy), 7)
+            self.assertEqual(segy.nsamples, 33)
+            self.assertEqual(segy.data_offset, 3600 + 2 * 3200)
+            self.assertTrue(segy.textual_header.startswith("C 1 TEST"))
+            np.testing.assert_array_equal(segy.get_headers(2, 3)['tracf'], [3, 4, 5])
+            np.testing.assert_array_equal(segy.headers['scalco'], -100)
+            np.testing.assert_array_equal(segy.get_traces(1, 4), samples[1:5])
+
+    def test_variable_extended_header_count(self):
+        samples = np.arange(3 * 10, dtype=np.float32).reshape(3, 10).astype('>f4')
+        write_segy(self.path, samples, 5, extended_headers=3, numhdr=-1)
+        with SegyReader(self.path) as segy:
+            self.assertEqual(segy.data_offset, 3600 + 3 * 3200)
+            np.testing.assert_array_equal(segy.get_traces(0, 3), samples)
+
+        write_segy(self.path, samples, 5, extended_headers=1, numhdr=-2)
+        with self.assertRaises(ValueError):
+            SegyReader(self.path)
+
+    def test_ibm_traces(self):
+        ibm = np.array([[0x41100000, 0xC1200000, 0x40800000, 0x00000000]], dtype='>u4')
+        write_segy(self.path, ibm, 1)
+        with SegyReader(self.path) as segy:
+            np.testing.assert_array_equal(segy.get_traces(0, 1), [[1.0, -2.0, 0.5, 0.0]])
+
+    def test_scan_headers_and_sidecar(self):
+        samples = np.zeros((5, 1100), dtype='>f4')
+        header_dtype = build_header_dtype(load_segy_format()['trace_header'], 240)
+        headers = np.zeros(5, dtype=header_dtype)
+        headers['fldr'] = [7, 7, 8, 8, 8]
+        headers['offset'] = [-50, 50, -100, 0, 100]
+        write_segy(self.path, samples, 5, headers)
+
+        with SegyReader(self.path) as segy:
+            index = segy.scan_headers(['fldr', 'offset'])
+            np.testing.assert_array_equal(index['fldr'], headers['fldr'])
+            np.testing.assert_array_equal(index['offset'], headers['offset'])
+            np.testing.assert_array_equal(index['byte_offset'], 3600 + np.arange(5) * (240 + 4400))
+            self.assertTrue(os.path.exists(self.path + ".headers.npy"))
+
+            cached = segy.scan_headers(['offset'])
+            self.assertEqual(cached.dtype.names, ('offset', 'byte_offset'))
+            np.testing.assert_array_equal(cached['offset'], headers['offset'])
+            with self.assertRaises(ValueError):
+                segy.scan_headers(['not_a_field'])
+
+    def test_variable_length_traces(self):
+        lengths = [40, 25, 60, 40]
+        samples = [(np.arange(n) + 100 * i).astype('>f4') for i, n in enumerate(lengths)]
+        header_dtype = build_header_dtype(load_segy_format()['trace_header'], 240)
+        headers = np.zeros(4, dtype=header_dtype)
+        headers['ns'] = [0, 25, 60, 40]  # First trace falls back to the binary header
+        headers['tracf'] = [1, 2, 3, 4]
+        write_segy(self.path, samples, 5, headers)
+
+        with SegyReader(self.path) as segy:
+            self.assertTrue(segy.variable_length)
+            self.assertEqual(len(segy), 4)
+            np.testing.assert_array_equal(segy.offsets['ns'], lengths)
+            np.testing.assert_array_equal(segy.offsets['byte_offset'],
+                                          3600 + np.cumsum([0] + [240 + 4 * n for n in lengths[:-1]]))
+            np.testing.assert_array_equal(segy.get_trace(2), samples[2])
+            np.testing.assert_array_equal(segy.get_headers(1, 3)['tracf'], [2, 3, 4])
+            traces = segy.get_traces(1, 2)
+            self.assertEqual(traces.shape, (2, 60))
+            np.testing.assert_array_equal(traces[0, :25], samples[1])
+            np.testing.assert_array_equal(traces[0, 25:], 0.0)
+            np.testing.assert_array_equal(segy.scan_headers(['tracf'], cache=False)['byte_offset'],
+                                          segy.offsets['byte_offset'])
+        self.assertTrue(os.path.exists(self.path + ".offsets.npy"))
+
+        with SegyReader(self.path) as segy:
+            np.testing.assert_array_equal(segy.offsets['ns'], lengths)
+            with self.assertRaises(ValueError):
+                segy.headers
+
+    def test_gather_runs_of_equal_stride(self):
+        lengths = [10, 10, 10, 25, 25, 7, 40, 40, 40, 40, 3]
+        samples = [np.full(n, i).astype('>f4') for i, n in enumerate(lengths)]
+        header_dtype = build_header_dtype(load_segy_format()['trace_header'], 240)
+        headers = np.zeros(len(lengths), dtype=header_dtype)
+        headers['ns'] = lengths
+        headers['tracf'] = np.arange(len(lengths))
+        write_segy(self.path, samples, 5, headers)
+
+        with SegyReader(self.path, cache=False) as segy:
+            self.assertTrue(segy.variable_length)
+            for start, count in ((0, 11), (2, 5), (10, 1), (4, 0)):
+                np.testing.assert_array_equal(segy.get_headers(start, count)['tracf'],
+                                              np.arange(start, start + count))
+            offsets = segy.offsets['byte_offset'][[0, 3, 4, 9]]
+            np.testing.assert_array_equal(segy._gather(offsets, 240).view(header_dtype)[:, 0]['tracf'],
+                                          [0, 3, 4, 9])
+
+    def test_read_only_sidecars(self):
+        lengths = [20, 30, 20]
+        samples = [np.arange(n).astype('>f4') for n in lengths]
+        header_dtype = build_header_dtype(load_segy_format()['trace_header'], 240)
+        headers = np.zeros(3, dtype=header_dtype)
+        headers['ns'] = lengths
+        headers['cdp'] = [2, 1, 2]
+        write_segy(self.path, samples, 5, headers)
+
+        with mock.patch.object(np, "save", side_effect=PermissionError("read-only")):
+            with SegyReader(self.path) as segy:
+                self.assertEqual(len(segy), 3)
+                self.assertEqual([cdp for cdp, _, _ in segy.iter_gathers('cdp')], [1, 2])
+        self.assertFalse(os.path.exists(self.path + ".offsets.npy"))
+        self.assertFalse(os.path.exists(self.path + ".headers.npy"))
+
+        with SegyReader(self.path, cache=False) as segy:
+            list(segy.iter_gathers('cdp', cache=False))
+        self.assertFalse(os.path.exists(self.path + ".headers.npy"))
+
+    def test_fixed_length_detected(self):
+        write_segy(self.path, np.ones((3, 10), dtype='>f4'), 5)
+        with SegyReader(self.path) as segy:
+            self.assertFalse(segy.variable_length)
+            np.testing.assert_array_equal(segy.get_trace(1), np.ones(10))
+
+    def test_mixed_lengths_with_fixed_size_detected(self):
+        lengths = [40, 20, 60, 40]  # Same total size as four 40-sample traces
+        samples = [np.full(n, i + 1).astype('>f4') for i, n in enumerate(lengths)]
+        header_dtype = build_header_dtype(load_segy_format()['trace_header'], 240)
+        headers = np.zeros(4, dtype=header_dtype)
+        headers['ns'] = lengths
+        write_segy(self.path, samples, 5, headers)
+
+        with SegyReader(self.path, cache=False) as segy:
+            self.assertTrue(segy.variable_length)
+            np.testing.assert_array_equal(segy.get_traces(1, 1)[0], samples[1])
+
+    def test_sample_formats_and_byte_order(self):
+        values = np.array([[-100, -1, 0, 1, 7, 100]] * 3)
+        for format_code, code in ((1, None), (2, 'i4'), (3, 'i2'), (5, 'f4'), (6, 'f8'), (8, 'i1'), (16, 'u1')):
+            for byte_order in ('>', '<'):
+                expected = np.abs(values) if code == 'u1' else values
+                if code is None:
+                    samples = ieee2ibm(expected, byte_order=byte_order)
+                else:
+                    samples = expected.astype(byte_order + code)
+                write_segy(self.path, samples, format_code, byte_order=byte_order)
+                with SegyReader(self.path) as segy:
+                    self.assertEqual(segy.byte_order, byte_order)
+                    if code is not None:
+                        self.assertEqual(segy.samples.dtype, np.dtype(byte_order + code))
+                    self.assertFalse(segy.variable_length)
+                    np.testing.assert_array_equal(segy.get_traces(0, 3), expected.astype(np.float32))
+
+    def test_iter_gathers_sorted_by_keys(self):
+        rng = np.random.default_rng(3)
+        header_dtype = build_header_dtype(load_segy_format()['trace_header'], 240)
+        headers = np.zeros(30, dtype=header_dtype)
+        headers['cdp'] = rng.integers(1, 6, 30)
+        headers['offset'] = rng.permutation(30) * 10
+        headers['tracl'] = np.arange(30)
+        samples = (np.arange(30)[:, np.newaxis] + np.zeros((1, 8))).astype('>f4')
+        write_segy(self.path, samples, 5, headers)
+
+        with SegyReader(self.path) as segy:
+            for prefetch in (True, False):
+                cdps = []
+                for cdp, gather_headers, traces in segy.iter_gathers('cdp', 'offset', prefetch=prefetch):
+                    cdps.append(cdp)
+                    np.testing.assert_array_equal(gather_headers['cdp'], cdp)
+                    self.assertTrue(np.all(np.diff(gather_headers['offset']) > 0))
+                    np.testing.assert_array_equal(traces[:, 0], gather_headers['tracl'])
+                self.assertEqual(cdps, sorted(np.unique(headers['cdp'])))
+
+    def test_unsupported_format(self):
+        write_segy(self.path, np.zeros((1, 4), dtype='>i4'), 4)
+        with self.assertRaises(ValueError):
+            SegyReader(self.path)
+
+
+class SegyWriterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "out.sgy")
+        self.samples = np.random.default_rng(2).standard_normal((9, 31)).astype(np.float32)
+        self.headers = np.zeros(9, dtype=[('fldr', np.int32), ('offset', np.int32), ('unknown', np.int32)])
+        self.headers['fldr'] = 10
+        self.headers['offset'] = np.arange(9) * 50
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_write_chunks_and_read_back(self):
+        for format_code, rtol in ((1, 2.0 ** -20), (5, 0)):
+            with SegyWriter(self.path, 31, 4000, format_code, "C 1 CLIENT DELIVERY",
+                            binary_header={'jobid': 42}) as writer:
+                writer.write(self.headers[:4], self.samples[:4])
+                writer.write(self.headers[4:], self.samples[4:])
+                self.assertEqual(writer.ntraces, 9)
+
+            self.assertEqual(os.path.getsize(self.path), 3600 + 9 * (240 + 4 * 31))
+            with SegyReader(self.path, cache=False) as segy:
+                self.assertFalse(segy.variable_length)
+                self.assertEqual(segy.binary_header['jobid'], 42)
+                self.assertEqual(segy.sample_interval, 4000)
+                self.assertTrue(segy.textual_header.startswith("C 1 CLIENT DELIVERY"))
+                np.testing.assert_array_equal(segy.headers['offset'], self.headers['offset'])
+                np.testing.assert_array_equal(segy.headers['ns'], 31)
+                np.testing.assert_allclose(segy.get_traces(0, 9), self.samples, rtol=rtol)
+
+    def test_integer_formats_are_rounded(self):
+        with SegyWriter(self.path, 31, 4000, format_code=3) as writer:
+            writer.write(self.headers, self.samples * 1000)
+        with SegyReader(self.path) as segy:
+            np.testing.assert_array_equal(segy.get_traces(0, 9), np.rint(self.samples * 1000))
+
+    def test_rejects_wrong_shape(self):
+        with SegyWriter(self.path, 31, 4000) as writer:
+            with self.assertRaises(ValueError):
+                writer.write(self.headers, self.samples[:, :30])
+
+
+class IBMConversionTests(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.values = (rng.standard_normal(1000) * 10.0 ** rng.integers(-30, 30, 1000)).astype(np.float32)
+        self.values[:4] = [0.0, 1.0, -2.0, 0.5]
+
+    def _reference(self, ibm):
+        """Decode IBM floats in float64"""
+        ibm = ibm.astype(np.int64)
+        sign = np.where(ibm >> 31, -1.0, 1.0)
+        return (sign * (ibm & 0xffffff) / 2.0 ** 24 * 16.0 ** (((ibm >> 24) & 0x7f) - 64)).astype(np.float32)
+
+    def test_known_values(self):
+        ibm = ieee2ibm(self.values[:4], byte_order='>')
+        self.assertEqual(ibm.dtype, np.dtype('>u4'))
+        np.testing.assert_array_equal(ibm, [0x00000000, 0x41100000, 0xC1200000, 0x40800000])
+        np.testing.assert_array_equal(ibm2ieee(ibm), self.values[:4])
+
+    def test_overflow_is_silent(self):
+        ibm = np.array([0x7fffffff, 0xffffffff, 0x41100000], dtype='>u4')
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            ieee = ibm2ieee(ibm)
+        np.testing.assert_array_equal(ieee, [np.inf, -np.inf, 1.0])
+
+    def test_round_trip_and_chunks(self):
+        ibm = ieee2ibm(self.values, chunk_size=77)
+        np.testing.assert_array_equal(ibm2ieee(ibm, chunk_size=64), self._reference(ibm))
+        np.testing.assert_allclose(ibm2ieee(ibm), self.values, rtol=2.0 ** -20)
+
+    def test_in_place(self):
+        buffer = ieee2ibm(self.values, byte_order='>').view(np.uint8).copy()
+        traces = buffer.view('>u4')
+        decoded = buffer.view(np.float32)
+        ibm2ieee(traces, out=decoded, chunk_size=100)
+        np.testing.assert_allclose(decoded, self.values, rtol=2.0 ** -20)
+        with self.assertRaises(ValueError):
+            ibm2ieee(traces, out=np.empty(10, dtype=np.float32))
+
+    def test_dask_variants(self):
+        import dask.array as da
+        values = da.from_array(self.values.reshape(10, 100), chunks=(3, 100))
+        ibm = ieee2ibm_dask(values, byte_order='>')
+        np.testing.assert_array_equal(ibm.compute(), ieee2ibm(self.values.reshape(10, 100), byte_order='>'))
+        np.testing.assert_array_equal(ibm2ieee_dask(ibm).compute(), ibm2ieee(ibm.compute()))